@@ -0,0 +1,100 @@
+"""
+explorer 遍历引擎基准测试
+
+生成一棵合成目录树 (默认 100 万个文件，每个目录 100 个文件、每层 100 个子目录)，
+分别用旧版 os.walk + os.path.getsize 的方式与新的 scandir 并行遍历 (walk) 统计全部文件，
+输出 files/sec。生成的目录树会保留在 --root 下供重复测试，再次运行时直接复用。
+
+注意：第二次及以后运行时目录元数据通常已在页缓存中，
+测得的是 "热缓存" 性能；网络文件系统上并行遍历的收益会明显更大。
+
+用法: python benchmarks/bench_explorer.py [--files 1000000] [--root DIR] [--workers 1,8,32]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "plugins"))
+import explorer  # noqa: E402
+
+FILES_PER_DIR = 100
+DIRS_PER_DIR = 100
+
+def build_tree(root, files):
+    """按 层/子目录/文件 生成目录树，已完整生成过 (存在标记文件) 时直接复用"""
+    marker = os.path.join(root, ".bench_complete")
+    if os.path.exists(marker):
+        return
+    if os.path.exists(root):
+        shutil.rmtree(root)
+    print(f"生成目录树: {root} ({files} 个文件)...", flush=True)
+    start = time.perf_counter()
+    leaves = -(-files // FILES_PER_DIR)
+    payload = b"x" * 64
+    made = 0
+    for leaf in range(leaves):
+        path = os.path.join(root, f"d{leaf // DIRS_PER_DIR:04d}", f"s{leaf % DIRS_PER_DIR:02d}")
+        os.makedirs(path, exist_ok=True)
+        for i in range(min(FILES_PER_DIR, files - made)):
+            with open(os.path.join(path, f"f{i:03d}.dat"), "wb") as f:
+                f.write(payload[:i % 64])
+        made += FILES_PER_DIR
+    open(marker, "w").close()
+    print(f"生成完成: {time.perf_counter() - start:.1f}s", flush=True)
+
+def legacy_walk(root):
+    """还原旧版 run_explorer 的遍历：os.walk + 每个文件一次 getsize"""
+    count = total = 0
+    for dirpath, dirs, files in os.walk(root):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+                count += 1
+            except OSError:
+                continue
+    return count, total
+
+def engine_walk(root, workers):
+    count = total = 0
+    for entry in explorer.walk(root, workers=workers):
+        if not entry.is_dir:
+            total += entry.size
+            count += 1
+    return count, total
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=1_000_000, help="合成目录树中的文件数")
+    parser.add_argument("--root", help="目录树位置 (默认在系统临时目录下)")
+    parser.add_argument("--workers", default="1,8,32", help="要测试的线程数，逗号分隔")
+    parser.add_argument("--cleanup", action="store_true", help="测试结束后删除目录树")
+    opts = parser.parse_args()
+
+    root = opts.root or os.path.join(tempfile.gettempdir(), f"explorer_bench_{opts.files}")
+    build_tree(root, opts.files)
+
+    print(f"{'MODE':<12} | {'FILES':>8} | {'TIME':>8} | {'FILES/S':>9}")
+    print("-" * 46)
+    runs = [("os.walk", legacy_walk)]
+    runs += [(f"walk x{w}", lambda r, w=int(w): engine_walk(r, w)) for w in opts.workers.split(",")]
+    expected = None
+    try:
+        for name, fn in runs:
+            start = time.perf_counter()
+            result = fn(root)
+            elapsed = time.perf_counter() - start
+            # 各模式统计出的文件数与总大小必须一致
+            if expected is None:
+                expected = result
+            elif result != expected:
+                print(f"结果不一致: {name} {result} != {expected}")
+            print(f"{name:<12} | {result[0]:>8} | {elapsed:>7.2f}s | {result[0] / elapsed:>9.0f}")
+    finally:
+        if opts.cleanup:
+            shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+gen 批量生成基准测试
+
+分别用旧版逐字符循环 ("".join(random.choice(chars) for _ in range(length)) / str(uuid.uuid4()))
+与新的批量生成器 (gen.generate：os.urandom 成块取熵 + translate 拒绝采样 + 步长拷贝排版)
+生成 --count 个值，输出 values/sec。结果只在内存中拼接，不计入磁盘写入开销。
+
+用法: python benchmarks/bench_gen.py [--count 1000000] [--len 16] [--types pwd,str,uuid]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "plugins"))
+import gen  # noqa: E402
+
+def legacy(kind, length, count):
+    """还原旧版 run_gen 的生成方式，每个值一次 Python 层循环"""
+    if kind == "uuid":
+        return sum(len(str(uuid.uuid4())) + 1 for _ in range(count))
+    chars = gen.ALPHABETS[kind]
+    return sum(len("".join(random.choice(chars) for _ in range(length))) + 1 for _ in range(count))
+
+def bulk(kind, length, count):
+    return sum(len(chunk) for chunk in gen.generate(kind, length, count))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000, help="每种模式生成的数量")
+    parser.add_argument("--len", type=int, default=16, help="pwd/str 的长度")
+    parser.add_argument("--types", default="pwd,str,uuid", help="要测试的类型，逗号分隔")
+    opts = parser.parse_args()
+
+    print(f"{'TYPE':<6} | {'MODE':<8} | {'COUNT':>9} | {'TIME':>8} | {'VALUES/S':>11}")
+    print("-" * 56)
+    for kind in opts.types.split(","):
+        expected = None
+        for name, fn in (("legacy", legacy), ("bulk", bulk)):
+            start = time.perf_counter()
+            size = fn(kind, opts.len, opts.count)
+            elapsed = time.perf_counter() - start
+            # 两种方式的输出总字节数必须一致 (每个值加一个换行)
+            if expected is None:
+                expected = size
+            elif size != expected:
+                print(f"结果不一致: {name} {size} != {expected}")
+            print(f"{kind:<6} | {name:<8} | {opts.count:>9} | {elapsed:>7.2f}s | {opts.count / elapsed:>11,.0f}")
+
+if __name__ == "__main__":
+    main()
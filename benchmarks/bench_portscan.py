@@ -0,0 +1,128 @@
+"""
+portscan 扫描引擎基准测试
+
+在本机启动一组监听端口 (listener farm)，分别用旧版 "一次性创建全部协程" 的方式、
+有界生产者引擎 (scan_engine)、多进程分片 (sharded_stream) 以及仅连接探测的
+selectors 快速路径扫描 127.0.0.1，
+输出 ports/sec 与峰值 RSS。每种模式在独立子进程中运行，互不影响峰值内存统计
+(sharded 模式只统计主进程)。
+
+用法: python benchmarks/bench_portscan.py [--ports 1-65535] [--listeners 200]
+"""
+import argparse
+import asyncio
+import multiprocessing as mp
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "plugins"))
+import portscan  # noqa: E402
+
+def peak_rss_mb():
+    """当前进程的峰值 RSS (MB)，不支持的平台返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+def listener_farm(count, conn, stop):
+    """在 127.0.0.1 的随机端口上开启 count 个监听，连接后吐出一行 Banner 并关闭"""
+    async def handle(reader, writer):
+        writer.write(b"SSH-2.0-BenchFarm\r\n")
+        await writer.drain()
+        writer.close()
+
+    async def main():
+        servers = [await asyncio.start_server(handle, "127.0.0.1", 0) for _ in range(count)]
+        conn.send([s.sockets[0].getsockname()[1] for s in servers])
+        while not stop.is_set():
+            await asyncio.sleep(0.1)
+        for s in servers:
+            s.close()
+
+    asyncio.run(main())
+
+async def legacy_scan(target, ports, ctl):
+    """还原旧版 main_loop：先为每个端口创建协程，再交给 as_completed (固定 500 并发)"""
+    sem = asyncio.Semaphore(500)
+
+    async def guarded(p):
+        async with sem:
+            return await portscan.scan_worker(target, p, ctl)
+
+    found = 0
+    for task in asyncio.as_completed([guarded(p) for p in ports]):
+        if await task:
+            found += 1
+    return found
+
+async def engine_scan(target, ports, ctl):
+    found = 0
+    async for _, res in portscan.scan_stream(((target, p) for p in ports), ctl):
+        if res:
+            found += 1
+    return found
+
+async def sharded_scan(target, spec, ctl):
+    found = 0
+    state = portscan.ScanState([target], spec)
+    async for _, res in portscan.sharded_stream(state, ctl=ctl):
+        if res:
+            found += 1
+    return found
+
+def sweep_scan(target, ports, ctl):
+    jobs = ((target, p) for p in ports)
+    return sum(1 for _, is_open in portscan.sweep_connect(jobs, ctl) if is_open)
+
+def run_mode(mode, spec, conn):
+    # 与 run_scan 一致：各模式都在提升后的描述符限制下运行
+    portscan.raise_fd_limit()
+    ports = portscan.parse_ports(spec)
+    ctl = portscan.AdaptiveController()
+    start = time.perf_counter()
+    if mode == "sweep":
+        found = sweep_scan("127.0.0.1", ports, ctl)
+    else:
+        scan = {"legacy": legacy_scan, "engine": engine_scan, "sharded": sharded_scan}[mode]
+        arg = {"legacy": list(ports), "engine": ports, "sharded": spec}[mode]
+        found = asyncio.run(scan("127.0.0.1", arg, ctl))
+    conn.send((len(ports), found, time.perf_counter() - start, peak_rss_mb(), ctl.summary()))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ports", default="1-65535", help="扫描的端口表达式")
+    parser.add_argument("--listeners", type=int, default=200, help="监听端口数量")
+    parser.add_argument("--modes", default="legacy,engine,sharded,sweep", help="要测试的模式，逗号分隔")
+    opts = parser.parse_args()
+
+    ctx = mp.get_context("spawn")
+    farm_conn, child_conn = ctx.Pipe()
+    stop = ctx.Event()
+    farm = ctx.Process(target=listener_farm, args=(opts.listeners, child_conn, stop), daemon=True)
+    farm.start()
+    farm_ports = farm_conn.recv()
+    print(f"listener farm: {len(farm_ports)} 个端口 ({min(farm_ports)}-{max(farm_ports)})")
+    print(f"{'MODE':<8} | {'PORTS':>7} | {'OPEN':>5} | {'TIME':>8} | {'PORTS/S':>9} | {'PEAK RSS':>9}")
+    print("-" * 62)
+
+    try:
+        for mode in opts.modes.split(","):
+            parent, child = ctx.Pipe()
+            proc = ctx.Process(target=run_mode, args=(mode, opts.ports, child))
+            proc.start()
+            total, found, elapsed, rss, params = parent.recv()
+            proc.join()
+            rss_str = f"{rss:.1f}MB" if rss is not None else "N/A"
+            print(f"{mode:<8} | {total:>7} | {found:>5} | {elapsed:>7.2f}s | {total / elapsed:>9.0f} | {rss_str:>9}")
+            print(f"         └ {params}")
+    finally:
+        stop.set()
+        farm.join(timeout=2)
+
+if __name__ == "__main__":
+    main()
@@ -1,56 +1,360 @@
 import os
+import io
+import sys
+import re
 import json
 import ast
+import hashlib
+import operator
+import argparse
+import tokenize
+from concurrent.futures import ProcessPoolExecutor
 
-def get_plugin_info(file_path):
+PLUGIN_DIR = "plugins"
+MANIFEST_NAME = "manifest.json"
+CACHE_NAME = ".manifest_cache.json"
+CACHE_VERSION = 2
+INDEX_VERSION = 2
+# 需要重新解析的文件少于该数量时直接在当前进程解析，省去进程池的启动开销
+POOL_THRESHOLD = 8
+
+# 行首的 __info__ 赋值 (允许类型注解)，找到后只解析这一条语句
+INFO_RE = re.compile(r"^__info__\s*(?::[^=\n]*)?=", re.M)
+SETUP_RE = re.compile(r"^def setup_args\s*\(", re.M)
+# 下一条顶层语句的开头 (行首非空白、非注释)，用于截取 setup_args 函数体
+TOP_LEVEL_RE = re.compile(r"\n(?=[^\s#])")
+# 参数模式中可直接写入清单的内建类型
+ARG_TYPES = {"int", "float", "str"}
+_BINOPS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod, ast.Pow: operator.pow,
+}
+_UNARYOPS = {ast.USub: operator.neg, ast.UAdd: operator.pos, ast.Not: operator.not_}
+
+class Dynamic(Exception):
+    """表达式依赖运行时 (函数调用、属性访问等)，无法静态求值"""
+
+def _statement_at(source, start):
+    """从 start 处截取一条完整的顶层语句：借助 tokenize 找到逻辑行结束处的 NEWLINE"""
+    lines = []
+    reader = io.StringIO(source[start:]).readline
+
+    def readline():
+        line = reader()
+        lines.append(line)
+        return line
+
+    for tok in tokenize.generate_tokens(readline):
+        if tok.type == tokenize.NEWLINE:
+            return "".join(lines[:tok.end[0]])
+    return "".join(lines)
+
+def _info_from_nodes(nodes):
+    for node in nodes:
+        if isinstance(node, ast.Assign):
+            targets = node.targets
+        elif isinstance(node, ast.AnnAssign) and node.value is not None:
+            targets = [node.target]
+        else:
+            continue
+        for target in targets:
+            if isinstance(target, ast.Name) and target.id == '__info__':
+                # 转换为 Python 字典对象
+                return ast.literal_eval(node.value)
+    return None
+
+def extract_info(source, file_path=""):
     """
-    使用 AST 抽象语法树解析元数据，无需运行代码即可提取 __info__
+    使用 AST 抽象语法树解析元数据，无需运行代码即可提取 __info__。
+    先按行首的 __info__ 定位，只解析这一条顶层语句；定位失败时才回退为解析整个文件
     """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            tree = ast.parse(f.read())
-            for node in tree.body:
-                if isinstance(node, ast.Assign):
-                    for target in node.targets:
-                        if isinstance(target, ast.Name) and target.id == '__info__':
-                            # 转换为 Python 字典对象
-                            return ast.literal_eval(node.value)
+        match = INFO_RE.search(source)
+        if match:
+            try:
+                info = _info_from_nodes(ast.parse(_statement_at(source, match.start())).body)
+                if info is not None:
+                    return info
+            except (SyntaxError, ValueError, tokenize.TokenError):
+                pass
+        return _info_from_nodes(ast.parse(source).body) or {}
     except Exception as e:
         print(f"解析 {file_path} 出错: {e}")
     return {}
 
-def generate_manifest():
+def get_plugin_info(file_path):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return extract_info(f.read(), file_path)
+
+def _module_constant(source, name, seen):
+    """静态求出模块顶层常量 name 的值：同样只定位并解析它的那一条赋值语句"""
+    if name in seen:
+        raise Dynamic(name)
+    match = re.search(rf"^{re.escape(name)}\s*(?::[^=\n]*)?=", source, re.M)
+    if not match:
+        raise Dynamic(name)
+    try:
+        node = ast.parse(_statement_at(source, match.start())).body[0]
+    except (SyntaxError, IndexError, tokenize.TokenError):
+        raise Dynamic(name)
+    if not isinstance(node, (ast.Assign, ast.AnnAssign)) or node.value is None:
+        raise Dynamic(name)
+    return static_value(node.value, source, seen | {name})
+
+def static_value(node, source, seen=frozenset()):
+    """
+    对参数表达式做受限的静态求值：字面量、容器、引用模块常量、算术运算与 f-string。
+    其余写法 (函数调用、属性访问等) 抛出 Dynamic
+    """
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        return [static_value(e, source, seen) for e in node.elts]
+    if isinstance(node, ast.Dict) and None not in node.keys:
+        return {static_value(k, source, seen): static_value(v, source, seen) for k, v in zip(node.keys, node.values)}
+    if isinstance(node, ast.Name):
+        return _module_constant(source, node.id, seen)
+    try:
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINOPS:
+            return _BINOPS[type(node.op)](static_value(node.left, source, seen), static_value(node.right, source, seen))
+        if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARYOPS:
+            return _UNARYOPS[type(node.op)](static_value(node.operand, source, seen))
+        if isinstance(node, ast.JoinedStr):
+            parts = []
+            for value in node.values:
+                if isinstance(value, ast.FormattedValue):
+                    spec = static_value(value.format_spec, source, seen) if value.format_spec else ""
+                    item = static_value(value.value, source, seen)
+                    item = {-1: item, 115: str(item), 114: repr(item), 97: ascii(item)}[value.conversion]
+                    parts.append(format(item, spec))
+                else:
+                    parts.append(value.value)
+            return "".join(parts)
+    except (TypeError, ValueError, ArithmeticError) as e:
+        raise Dynamic(str(e))
+    raise Dynamic(ast.dump(node))
+
+def _setup_args_node(source):
+    """定位 setup_args 并只解析该函数；定位或解析失败时回退为解析整个文件"""
+    match = SETUP_RE.search(source)
+    if not match:
+        return None
+    end = TOP_LEVEL_RE.search(source, match.end())
+    try:
+        body = ast.parse(source[match.start():end.start() + 1 if end else len(source)]).body
+        if body and isinstance(body[0], ast.FunctionDef):
+            return body[0]
+    except SyntaxError:
+        pass
+    for node in ast.parse(source).body:
+        if isinstance(node, ast.FunctionDef) and node.name == "setup_args":
+            return node
+    return None
+
+def extract_args(source):
+    """
+    从 setup_args 中静态提取参数模式，返回 (参数列表, 是否完整) ；没有 setup_args 时返回 (None, True)。
+    每条 parser.add_argument(...) 记为 {"flags": [...], 关键字参数...}；
+    无法静态求值的关键字参数列入该条的 "dynamic"，其他语句 (分组、循环等) 使结果标记为不完整
+    """
+    func = _setup_args_node(source)
+    if func is None:
+        return None, True
+    parser_name = func.args.args[0].arg if func.args.args else None
+    args, complete = [], True
+    for stmt in func.body:
+        if isinstance(stmt, ast.Pass) or (isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant)):
+            continue  # pass 与文档字符串
+        call = stmt.value if isinstance(stmt, ast.Expr) else None
+        if not (isinstance(call, ast.Call) and isinstance(call.func, ast.Attribute)
+                and call.func.attr == "add_argument" and isinstance(call.func.value, ast.Name)
+                and call.func.value.id == parser_name):
+            complete = False
+            continue
+        try:
+            spec = {"flags": [static_value(a, source) for a in call.args]}
+        except Dynamic:
+            complete = False
+            continue
+        dynamic = []
+        for kw in call.keywords:
+            if kw.arg is None:
+                dynamic.append("**")
+            elif kw.arg == "type" and isinstance(kw.value, ast.Name) and kw.value.id in ARG_TYPES:
+                spec["type"] = kw.value.id
+            else:
+                try:
+                    spec[kw.arg] = static_value(kw.value, source)
+                except Dynamic:
+                    dynamic.append(kw.arg)
+        if dynamic:
+            spec["dynamic"] = dynamic
+            complete = False
+        args.append(spec)
+    return args, complete
+
+def extract_plugin(source, name, file_path=""):
+    """提取清单需要的全部静态信息：__info__、入口函数是否存在、setup_args 参数模式"""
+    try:
+        args, complete = extract_args(source)
+    except Exception as e:
+        print(f"解析 {file_path} 的 setup_args 出错: {e}")
+        args, complete = None, False
+    entry = f"run_{name}"
+    return {
+        "info": extract_info(source, file_path),
+        "entry": entry if re.search(rf"^(?:async\s+)?def {entry}\s*\(", source, re.M) else None,
+        "args": args,
+        "args_complete": complete,
+    }
+
+def _parse_job(job):
+    filename, source = job
+    return filename, extract_plugin(source, filename[:-3], os.path.join(PLUGIN_DIR, filename))
+
+def load_cache(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            cache = json.load(f)
+        if cache.get("version") == CACHE_VERSION:
+            return cache.get("files", {})
+    except (OSError, ValueError, AttributeError):
+        pass
+    return {}
+
+def scan_plugins(plugin_dir, cache):
+    """
+    增量收集插件元数据，返回 ({文件名: 缓存记录}, 重新解析的文件数)。
+    mtime 与大小都未变的文件直接复用缓存 (不读取内容)；
+    否则读取并计算 sha256，内容未变 (例如刚 checkout 导致 mtime 变化) 仍复用缓存；
+    真正变化的文件才重新解析，数量较多时交给进程池并行处理
+    """
+    records = {}
+    jobs = []
+    for entry in os.scandir(plugin_dir):
+        filename = entry.name
+        if not (filename.endswith(".py") and not filename.startswith("__") and entry.is_file()):
+            continue
+        st = entry.stat()
+        old = cache.get(filename)
+        if old and old["mtime_ns"] == st.st_mtime_ns and old["size"] == st.st_size:
+            records[filename] = old
+            continue
+        with open(entry.path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        record = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": digest}
+        if old and old["sha256"] == digest:
+            records[filename] = dict(record, plugin=old["plugin"])
+            continue
+        try:
+            source = data.decode("utf-8")
+        except UnicodeDecodeError as e:
+            # 单个文件编码有误不影响其他插件，跳过该文件 (不写入缓存，修复后下次自动重新解析)
+            print(f"解析 {entry.path} 出错: {e}，已跳过")
+            continue
+        records[filename] = record
+        jobs.append((filename, source))
+
+    if len(jobs) >= POOL_THRESHOLD:
+        with ProcessPoolExecutor() as pool:
+            results = list(pool.map(_parse_job, jobs, chunksize=max(1, len(jobs) // (4 * (os.cpu_count() or 1)))))
+    else:
+        results = [_parse_job(job) for job in jobs]
+    for filename, plugin in results:
+        records[filename]["plugin"] = plugin
+    return records, len(jobs)
+
+def _json_matches(path, text):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read() == text
+    except OSError:
+        return False
+
+def _write_json(path, data):
+    """内容有变化时才写入 (临时文件 + 替换)，避免无意义地改动文件"""
+    text = json.dumps(data, ensure_ascii=False, indent=4)
+    if _json_matches(path, text):
+        return False
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+    return True
+
+def generate_manifest(check=False):
+    """
+    生成插件清单；check=True 时只检查已提交的清单是否与插件源码一致，不写入任何文件。
+    返回清单是否为最新 (生成模式下总是 True)
+    """
     # 核心修改：指定插件存放的子目录
-    plugin_dir = "plugins"
-    manifest_name = "manifest.json"
-    
+    plugin_dir = PLUGIN_DIR
+    manifest_name = MANIFEST_NAME
+
     plugins_list = []
-    
+
     if not os.path.exists(plugin_dir):
         print(f"错误: 未找到 {plugin_dir} 目录")
-        return
-
-    # 遍历 plugins 文件夹
-    for filename in os.listdir(plugin_dir):
-        if filename.endswith(".py") and not filename.startswith("__"):
-            file_path = os.path.join(plugin_dir, filename)
-            info = get_plugin_info(file_path)
-            
-            # 提取元数据，若缺失则提供默认值
-            plugins_list.append({
-                "name": filename.replace(".py", ""),
-                "file": f"plugins/{filename}",  # 注意：这里路径包含子目录名
-                "desc": info.get("help", "暂无描述"),
-                "author": info.get("author", "Admin"),
-                "license": info.get("license", "MIT")
-            })
-    
-    # 写入根目录
-    output_data = {"plugins": plugins_list}
-    with open(manifest_name, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=4)
-    
-    print(f"成功更新 {manifest_name}，共计 {len(plugins_list)} 个插件。")
+        return False
+
+    records, parsed = scan_plugins(plugin_dir, load_cache(CACHE_NAME))
+
+    # 按文件名排序，保证清单内容与目录遍历顺序无关
+    commands = {}
+    for filename in sorted(records):
+        record = records[filename]
+        plugin = record["plugin"]
+        info = plugin["info"]
+        name = filename.replace(".py", "")
+        aliases = list(info.get("alias", []))
+
+        # 命令索引：插件名与别名都映射到插件名，冲突时保留先出现的并给出警告
+        for command in [name] + aliases:
+            if commands.setdefault(command, name) != name:
+                print(f"警告: {name} 的命令名 {command} 已被 {commands[command]} 使用，已忽略")
+        if plugin["entry"] is None:
+            print(f"警告: {filename} 中未找到入口函数 run_{name}")
+
+        # 提取元数据，若缺失则提供默认值
+        plugins_list.append({
+            "name": name,
+            "file": f"plugins/{filename}",  # 注意：这里路径包含子目录名
+            "desc": info.get("help", "暂无描述"),
+            "author": info.get("author", "Admin"),
+            "license": info.get("license", "MIT"),
+            "sha256": record["sha256"],  # 使用方可据此判断本地副本是否过期，无需下载
+            "version": info.get("version", "0.0.0"),
+            "alias": aliases,
+            "depends": list(info.get("depends", [])),
+            "entry": plugin["entry"],
+            # 参数模式：null 表示插件没有 setup_args；args_complete 为 false 时需导入插件调用 setup_args 才能得到完整参数
+            "args": plugin["args"],
+            "args_complete": plugin["args_complete"]
+        })
+
+    # 写入根目录；commands 让宿主只读清单即可把命令/别名解析到插件，只导入要运行的那一个
+    output_data = {"index_version": INDEX_VERSION, "commands": commands, "plugins": plugins_list}
+    if check:
+        if _json_matches(manifest_name, json.dumps(output_data, ensure_ascii=False, indent=4)):
+            print(f"{manifest_name} 已是最新，共计 {len(plugins_list)} 个插件。")
+            return True
+        print(f"{manifest_name} 与插件源码不一致，请运行 python generate_manifest.py 重新生成。")
+        return False
+
+    changed = _write_json(manifest_name, output_data)
+    try:
+        _write_json(CACHE_NAME, {"version": CACHE_VERSION, "files": records})
+    except OSError as e:
+        print(f"写入缓存 {CACHE_NAME} 失败: {e}")
+
+    state = "成功更新" if changed else "内容未变化"
+    print(f"{state} {manifest_name}，共计 {len(plugins_list)} 个插件 (重新解析 {parsed} 个)。")
+    return True
 
 if __name__ == "__main__":
-    generate_manifest()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=f"扫描 {PLUGIN_DIR}/ 生成插件清单 {MANIFEST_NAME}")
+    parser.add_argument("--check", action="store_true",
+                        help="只检查清单是否为最新，不写入任何文件；过期时以非零状态码退出")
+    opts = parser.parse_args()
+    sys.exit(0 if generate_manifest(check=opts.check) else 1)
@@ -1,6 +1,11 @@
+import json
+import os
 import subprocess
 import platform
 import shutil
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
 __info__ = {
     "help": "检查 Node, Python, Docker 等版本",
@@ -11,75 +16,195 @@ __info__ = {
     "depends": []
 }
 
+# 待检查的工具列表：(工具名, 检查命令)
+CHECKS = [
+    ("Python", ["python", "--version"]),
+    ("Node.js", ["node", "-v"]),
+    ("NPM", ["npm", "-v"]),
+    ("Docker", ["docker", "-v"]),
+    ("Git", ["git", "--version"]),
+    ("Java", ["java", "-version"]),
+    ("Go", ["go", "version"]),
+    ("Rust", ["rustc", "--version"]),
+    ("MySQL", ["mysql", "--version"]),
+    ("Redis", ["redis-server", "--version"]),
+]
+PROBE_TIMEOUT = 2
+PROBE_FAILED = "检查失败"
+CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "cli-kit", "env_check_cache.json")
+CACHE_TTL = 7 * 24 * 3600
+
+# 单个工具的检查结果：path 为 None 表示未安装，version 为版本号 (或 "检查失败" 等说明)，cached 表示取自缓存
+Probe = namedtuple("Probe", "name cmd path version cached")
+
 def setup_args(parser):
-    """该模块目前不需要额外参数，直接运行即可"""
-    pass
+    """定义命令行参数模式"""
+    parser.add_argument("--refresh", action="store_true", help="忽略版本缓存，重新运行全部检查命令")
+    parser.add_argument("--ttl", type=int, default=CACHE_TTL, help="版本缓存有效期 (秒)，0 为不使用缓存")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出检查结果")
 
-def get_version(cmd):
+def binary_identity(path):
+    """可执行文件的身份：解析符号链接后的真实路径 + inode + 大小 + mtime，任一变化即视为换了二进制"""
+    try:
+        real = os.path.realpath(path)
+        st = os.stat(real)
+    except OSError:
+        return None
+    return [real, st.st_ino, st.st_size, st.st_mtime_ns]
+
+class VersionCache:
+    """
+    版本号磁盘缓存 (JSON)：键为 which 解析出的路径 + 检查命令参数，
+    命中要求二进制身份不变且未超过 TTL；检查失败的结果不缓存
+    """
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.dirty = False
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def key(path, cmd):
+        return "\0".join([path] + cmd[1:])
+
+    def get(self, path, cmd):
+        entry = self.entries.get(self.key(path, cmd))
+        if not entry or time.time() - entry.get("time", 0) > self.ttl:
+            return None
+        if entry.get("id") != binary_identity(path):
+            return None
+        return entry.get("version")
+
+    def put(self, path, cmd, version):
+        identity = binary_identity(path)
+        if identity is None or version in (None, PROBE_FAILED):
+            return
+        self.entries[self.key(path, cmd)] = {"id": identity, "version": version, "time": time.time()}
+        self.dirty = True
+
+    def save(self):
+        """有变化时原子写回 (先写临时文件再替换)，写入失败不影响本次检查"""
+        if not self.dirty:
+            return
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+            self.dirty = False
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+def get_version(cmd, path=None):
     """
     尝试运行命令获取版本号。
     如果命令不存在，返回 None；否则返回版本号字符串。
+    path 为已经 which 解析过的可执行文件路径，传入时不再重复查找
     """
     # 查找命令是否存在
-    if not shutil.which(cmd[0]):
+    path = path or shutil.which(cmd[0])
+    if not path:
         return None
     
     try:
         # 运行类似 'node -v' 的命令
         result = subprocess.run(
-            cmd, 
+            [path] + cmd[1:], 
             stdout=subprocess.PIPE, 
             stderr=subprocess.PIPE, 
             text=True, 
             shell=True if platform.system() == "Windows" else False,
-            timeout=2
+            timeout=PROBE_TIMEOUT
         )
         output = result.stdout.strip() or result.stderr.strip()
         # 简单清理输出，只取第一行（有些工具输出很长）
         return output.split('\n')[0] if output else "已安装 (未知版本)"
     except Exception:
-        return "检查失败"
+        return PROBE_FAILED
+
+def probe(name, cmd, path):
+    return Probe(name, cmd, path, get_version(cmd, path) if path else None, False)
+
+def probe_all(checks=CHECKS, cache=None, refresh=False):
+    """
+    检查全部工具，每个命令最多运行一次：先用 which + 缓存 (只需 stat，不 fork) 筛出命中项，
+    其余在线程池中并发运行。子进程等待期间不占用 GIL，总耗时取决于最慢的那一个，而不是全部之和
+    """
+    report = [None] * len(checks)
+    misses = []
+    for i, (name, cmd) in enumerate(checks):
+        path = shutil.which(cmd[0])
+        version = cache.get(path, cmd) if cache and path and not refresh else None
+        if version is not None or not path:
+            report[i] = Probe(name, cmd, path, version, version is not None)
+        else:
+            misses.append((i, name, cmd, path))
+
+    if misses:
+        with ThreadPoolExecutor(max_workers=len(misses)) as pool:
+            for i, item in zip([m[0] for m in misses], pool.map(lambda m: probe(*m[1:]), misses)):
+                report[i] = item
+                if cache:
+                    cache.put(item.path, item.cmd, item.version)
+    if cache:
+        cache.save()
+    return report
+
+def report_json(report, elapsed):
+    return json.dumps({
+        "platform": f"{platform.system()} {platform.release()}",
+        "elapsed": round(elapsed, 4),
+        "tools": [
+            {"name": item.name, "command": item.cmd, "path": item.path, "installed": bool(item.version),
+             "version": item.version, "cached": item.cached}
+            for item in report
+        ],
+    }, ensure_ascii=False, indent=2)
 
 def run_env_check(args, tools):
     Fore = tools["Fore"]
-    
+    ttl = getattr(args, 'ttl', CACHE_TTL)
+    cache = VersionCache(ttl=ttl) if ttl > 0 else None
+
+    start = time.time()
+    report = probe_all(CHECKS, cache, getattr(args, 'refresh', False))
+    elapsed = time.time() - start
+
+    if getattr(args, 'json', False):
+        print(report_json(report, elapsed))
+        return
+
     print(f"{Fore.CYAN}🛡️  CLI-Kit 环境体检报告")
     print(f"系统平台 : {platform.system()} {platform.release()}")
     print("-" * 62)
 
-    # 待检查的工具列表：(工具名, 检查命令)
-    checks = [
-        ("Python", ["python", "--version"]),
-        ("Node.js", ["node", "-v"]),
-        ("NPM", ["npm", "-v"]),
-        ("Docker", ["docker", "-v"]),
-        ("Git", ["git", "--version"]),
-        ("Java", ["java", "-version"]),
-        ("Go", ["go", "version"]),
-        ("Rust", ["rustc", "--version"]),
-        ("MySQL", ["mysql", "--version"]),
-        ("Redis", ["redis-server", "--version"]),
-    ]
-
     print(f"{'工具项目':<15} | {'状态 / 版本号':<30}")
     print("-" * 62)
 
-    found_count = 0
-    for name, cmd in checks:
-        version = get_version(cmd)
-        if version:
-            status = f"{Fore.GREEN}{version}"
-            found_count += 1
+    found = {item.name for item in report if item.version}
+    for item in report:
+        if item.version:
+            status = f"{Fore.GREEN}{item.version}"
         else:
             status = f"{Fore.RED}未安装"
         
-        print(f"{name:<15} | {status}")
+        print(f"{item.name:<15} | {status}")
 
     print("-" * 62)
-    print(f"📊 统计：已安装 {found_count} / 总计 {len(checks)}")
+    cached = sum(item.cached for item in report)
+    print(f"📊 统计：已安装 {len(found)} / 总计 {len(report)} | 耗时 {elapsed:.2f}s" +
+          (f" (缓存命中 {cached})" if cached else ""))
     
-    # 额外逻辑：如果安装了 Node 但没安装 Docker，给个温馨提示
-    if not any("docker" in str(c).lower() for n, c in checks if get_version(c)):
+    # 额外逻辑：如果没安装 Docker，给个温馨提示
+    if "Docker" not in found:
         print(f"\n{Fore.YELLOW}💡 提示: 您似乎还没有安装 Docker，在进行容器化开发时可能会用到。")
 
-    print("-" * 62)
\ No newline at end of file
+    print("-" * 62)
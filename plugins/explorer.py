@@ -1,6 +1,15 @@
+import csv
+import hashlib
+import heapq
+import mmap
 import os
+import re
+import sqlite3
+import sys
 import time
-from fnmatch import fnmatch
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from json.encoder import encode_basestring as _json_str
 
 __info__ = {
     "help": "自定义目录扫描",
@@ -11,78 +20,868 @@ __info__ = {
     "depends": []
 }
 
+EXCLUDE_DIRS = [".git", "__pycache__", ".venv", "node_modules", ".idea", ".vscode"]
+
+# 每个目录中按顺序读取的忽略规则文件 (同 .gitignore 语法)
+IGNORE_FILES = (".gitignore", ".ignore")
+
+# 目录读取与 stat 都会释放 GIL，线程数按 I/O 并发而不是 CPU 核数取值
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# 遍历产出的条目；目录条目 size 为 0
+Entry = namedtuple("Entry", "path name depth is_dir size mtime")
+
+EXPORT_FIELDS = ("path", "size", "mtime", "depth")
+DUPE_FIELDS = ("group", "size", "path")
+EXPORT_FORMATS = ("jsonl", "csv", "nul")
+
+DEFAULT_INDEX = os.path.join(os.path.expanduser("~"), ".cache", "cli-kit", "explorer_index.sqlite")
+
+# 重复文件查找：部分哈希读取首尾各 PARTIAL_BLOCK 字节；
+# 完整哈希时大于 MMAP_THRESHOLD 的文件整体 mmap，其余用复用缓冲区 readinto
+PARTIAL_BLOCK = 4096
+MMAP_THRESHOLD = 64 * 1024 * 1024
+HASH_CHUNK = 1 << 20
+
+# 目录 mtime 与写入索引的时间相差不足该值 (纳秒) 时不信任它：
+# 同一时间戳粒度内的后续修改不会再改变 mtime，下次必须重新读取
+_RACY_NS = 2 * 10**9
+
+def setup_args(parser):
+    """定义命令行参数模式"""
+    parser.add_argument("path", nargs="?", help="要遍历的根目录")
+    parser.add_argument("--pattern", help="文件匹配模式 (如 *.py, *test*)")
+    parser.add_argument("--include", action="append", default=[], help="只保留匹配的文件，可多次指定")
+    parser.add_argument("--exclude", action="append", default=[], help="排除匹配的文件或目录，可多次指定")
+    parser.add_argument("--no-ignore", action="store_true", help="不读取 .gitignore / .ignore")
+    parser.add_argument("--max-depth", type=int, help="最大遍历深度")
+    parser.add_argument("--workers", type=int, help="并行读取目录的线程数")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, help="导出格式 (未指定 -o 时写到标准输出)")
+    parser.add_argument("-o", "--output", help="导出文件路径")
+    parser.add_argument("-q", "--quiet", action="store_true", help="不在终端打印目录树")
+    parser.add_argument("--index", nargs="?", const=DEFAULT_INDEX,
+                        help="使用持久化索引增量扫描 (可指定索引文件)")
+    parser.add_argument("--query", action="store_true", help="直接从索引查询，不访问文件系统")
+    parser.add_argument("--dupes", action="store_true", help="查找重复文件并统计可回收空间")
+    parser.add_argument("--du", action="store_true", help="统计目录空间占用 (--max-depth 为树的显示深度)")
+    parser.add_argument("--top", type=int, default=10, help="空间占用: 每层显示及排行的条目数")
+    parser.add_argument("--min-size", help="查询/查重: 最小文件大小 (如 10M)")
+    parser.add_argument("--max-size", help="查询: 最大文件大小 (如 1G)")
+
+def parse_size(text):
+    """解析 512 / 10K / 1.5M / 2G 形式的大小"""
+    text = text.strip().upper().rstrip("B")
+    units = {"K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+class ScanIndex:
+    """
+    持久化扫描索引 (SQLite)：记录每个目录的 mtime、子目录名与文件 (大小、修改时间)。
+    再次扫描时目录 mtime 未变就直接复用缓存的列表，只需一次 stat 而不必 scandir + 逐个 stat。
+    注意目录 mtime 只反映条目的增删改名，文件内容被原地改写时其大小以上次扫描为准
+    """
+
+    def __init__(self, path):
+        self.path = path
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.executescript("""
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS dirs (
+                path TEXT PRIMARY KEY, mtime INTEGER, subdirs TEXT
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS files (
+                dir TEXT, name TEXT, size INTEGER, mtime REAL, PRIMARY KEY (dir, name)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS files_size ON files (size);
+        """)
+        self.pending = 0
+
+    def lookup(self, path):
+        """返回 (mtime_ns, 子目录名列表, [(name, size, mtime)])，未索引时返回 None"""
+        row = self.db.execute("SELECT mtime, subdirs FROM dirs WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            return None
+        files = self.db.execute("SELECT name, size, mtime FROM files WHERE dir = ?", (path,)).fetchall()
+        return row[0], row[1].split("\0") if row[1] else [], files
+
+    def store(self, path, mtime_ns, subdirs, files):
+        """以新读取的目录内容替换旧记录，并清理已消失子目录的整棵子树"""
+        if time.time_ns() - mtime_ns < _RACY_NS:
+            mtime_ns = -1
+        row = self.db.execute("SELECT subdirs FROM dirs WHERE path = ?", (path,)).fetchone()
+        if row and row[0]:
+            for name in set(row[0].split("\0")).difference(subdirs):
+                self.forget(os.path.join(path, name))
+        self.db.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?)", (path, mtime_ns, "\0".join(subdirs)))
+        self.db.execute("DELETE FROM files WHERE dir = ?", (path,))
+        self.db.executemany("INSERT INTO files VALUES (?, ?, ?, ?)",
+                            ((path, e.name, e.size, e.mtime) for e in files))
+        # 批量提交，避免每个目录一次事务
+        self.pending += 1
+        if self.pending >= 500:
+            self.commit()
+
+    def forget(self, path):
+        """删除 path 及其所有子孙目录的记录 (按前缀区间删除，避免 LIKE 的通配符转义)"""
+        lo, hi = path + os.sep, path + chr(ord(os.sep) + 1)
+        for table, col in (("dirs", "path"), ("files", "dir")):
+            self.db.execute(f"DELETE FROM {table} WHERE {col} = ? OR ({col} >= ? AND {col} < ?)", (path, lo, hi))
+
+    def query(self, root, match=None, min_size=None, max_size=None):
+        """
+        在 root 子树内按大小 (SQL 过滤) 与路径 (match) 查询，产出 Entry (depth 相对 root)。
+        match 接收相对 root、以 '/' 分隔的路径
+        """
+        root = os.path.abspath(root).rstrip(os.sep) or os.sep
+        lo, hi = root.rstrip(os.sep) + os.sep, root.rstrip(os.sep) + chr(ord(os.sep) + 1)
+        sql = "SELECT dir, name, size, mtime FROM files WHERE (dir = ? OR (dir >= ? AND dir < ?))"
+        params = [root, lo, hi]
+        if min_size is not None:
+            sql += " AND size >= ?"
+            params.append(min_size)
+        if max_size is not None:
+            sql += " AND size <= ?"
+            params.append(max_size)
+        base = root.rstrip(os.sep).count(os.sep)
+        skip = len(lo)
+        for dir_path, name, size, mtime in self.db.execute(sql + " ORDER BY dir, name", params):
+            rel = (dir_path[skip:].replace(os.sep, "/") + "/" if dir_path != root else "") + name
+            if match is None or match(rel):
+                yield Entry(os.path.join(dir_path, name), name, dir_path.count(os.sep) - base + 1, False, size, mtime)
+
+    def commit(self):
+        self.db.commit()
+        self.pending = 0
+
+    def close(self):
+        self.commit()
+        self.db.close()
+
+class ListingSink:
+    """
+    文件列表导出：遍历过程中逐条写入带缓冲的文件或标准输出，不在内存中累积
+    - jsonl: 每行一个 JSON 对象 (path, size, mtime, depth)
+    - csv  : 带表头的 CSV
+    - nul  : 以 \\0 分隔的路径，可直接交给 xargs -0
+    """
+
+    def __init__(self, fmt, path=None, fields=EXPORT_FIELDS):
+        self.fmt = fmt
+        self.to_file = path not in (None, "-")
+        self.count = 0
+        if self.to_file:
+            # surrogateescape 保证无法按 UTF-8 解码的文件名也能原样写出
+            self.f = open(path, "w", encoding="utf-8", errors="surrogateescape",
+                          newline="", buffering=1 << 20)
+        else:
+            self.f = sys.stdout
+        self._csv = csv.writer(self.f) if fmt == "csv" else None
+        if self._csv:
+            self._csv.writerow(fields)
+
+    @property
+    def log(self):
+        """提示与统计的输出流：列表写到标准输出时改走 stderr，保证管道中只有数据"""
+        return sys.stdout if self.to_file else sys.stderr
+
+    def write(self, entry):
+        self.count += 1
+        if self.fmt == "jsonl":
+            # 只有 path 需要转义；json.dumps 带参数调用时每次都会新建编码器，百万行时开销明显
+            self.f.write(f'{{"path": {_json_str(entry.path)}, "size": {entry.size}, '
+                         f'"mtime": {entry.mtime}, "depth": {entry.depth}}}\n')
+        elif self._csv:
+            self._csv.writerow((entry.path, entry.size, entry.mtime, entry.depth))
+        else:
+            self.f.write(entry.path + "\0")
+
+    def write_group(self, size, paths):
+        """写出一组重复文件：jsonl 为一个对象，csv 每个文件一行 (DUPE_FIELDS)，nul 组间以空记录分隔"""
+        self.count += 1
+        if self.fmt == "jsonl":
+            self.f.write(f'{{"size": {size}, "paths": [{", ".join(map(_json_str, paths))}]}}\n')
+        elif self._csv:
+            self._csv.writerows((self.count, size, p) for p in paths)
+        else:
+            self.f.write("\0".join(paths) + "\0\0")
+
+    def close(self):
+        if self.to_file:
+            self.f.close()
+        else:
+            self.f.flush()
+
+def glob_to_regex(pat):
+    """
+    把 gitignore 风格的 glob 转为正则片段 (不含捕获组)：
+    * 与 ? 不跨越 '/'，'**/' 匹配任意层目录，结尾的 '/**' 匹配其下全部内容
+    """
+    out = []
+    i, n = 0, len(pat)
+    while i < n:
+        c = pat[i]
+        if c == '*':
+            j = i
+            while j < n and pat[j] == '*':
+                j += 1
+            at_segment = i == 0 or pat[i - 1] == '/'
+            if j - i >= 2 and at_segment and j == n:
+                out.append('.*')
+            elif j - i >= 2 and at_segment and pat[j] == '/':
+                out.append('(?:.*/)?')
+                j += 1
+            else:
+                out.append('[^/]*')
+            i = j
+            continue
+        if c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            j = i + 1
+            if j < n and pat[j] in '!^':
+                j += 1
+            if j < n and pat[j] == ']':
+                j += 1
+            j = pat.find(']', j)
+            if j < 0:
+                out.append('\\[')
+            else:
+                stuff = pat[i + 1:j].replace('\\', '\\\\')
+                if stuff[0] in '!^':
+                    stuff = '^' + stuff[1:]
+                out.append(f'[{stuff}]')
+                i = j
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            out.append(re.escape(pat[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+def parse_rules(lines, base=""):
+    """
+    解析 gitignore 规则，产出 (regex, negate, dir_only)。
+    regex 针对相对遍历根目录、以 '/' 分隔的路径；base 为规则文件所在目录 (如 'a/b/')
+    """
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if not line.endswith('\\ '):
+            line = line.rstrip(' ')
+        if not line or line.startswith('#'):
+            continue
+        negate = line.startswith('!')
+        if negate:
+            line = line[1:]
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            continue
+        # 含 '/' 的规则相对规则文件所在目录锚定，否则匹配其下任意层级
+        anchored = '/' in line
+        prefix = re.escape(base) + ('' if anchored else '(?:.*/)?')
+        yield prefix + glob_to_regex(line.lstrip('/')), negate, dir_only
+
+def compile_rules(rules, dirs, subtree=False):
+    """
+    把一组规则编译成一个正则：规则逆序排列为命名分支，re 取第一个能匹配的分支，
+    即 "最后一条匹配的规则生效"；m.lastgroup 的首字母区分忽略 (i) 与反向规则 (n)。
+    subtree 为 True 时规则同样匹配其下的所有路径，用于不经逐级剪枝的场合 (如索引查询)
+    """
+    if subtree:
+        alts = [f"(?P<{'n' if negate else 'i'}{k}>{regex}{'/.*' if dir_only else '(?:/.*)?'})"
+                for k, (regex, negate, dir_only) in reversed(list(enumerate(rules)))]
+    else:
+        alts = [f"(?P<{'n' if negate else 'i'}{k}>{regex})"
+                for k, (regex, negate, dir_only) in reversed(list(enumerate(rules)))
+                if dirs or not dir_only]
+    return re.compile(f"(?:{'|'.join(alts)})\\Z") if alts else None
+
+class RuleSet:
+    """
+    某一目录层级生效的全部规则 (默认排除、上级与本级忽略文件、命令行 --exclude)，
+    文件与目录各编译成一个正则。没有自己忽略文件的子目录直接共享父级对象，
+    嵌套的忽略文件只解析本级新增的规则，不会重新解析上级
+    """
+
+    def __init__(self, path_filter, rules):
+        self.filter = path_filter
+        self.rules = rules
+        combined = rules + path_filter.excludes
+        self.file_rx = compile_rules(combined, dirs=False)
+        self.dir_rx = compile_rules(combined, dirs=True)
+        self._tree_rx = None
+
+    def enter(self, path, rel, names):
+        """进入目录 path (相对路径 rel，以 '/' 结尾)：存在忽略文件时派生新规则集"""
+        own = []
+        for name in self.filter.ignore_files:
+            if name in names:
+                try:
+                    with open(os.path.join(path, name), "r", encoding="utf-8", errors="replace") as f:
+                        own.extend(parse_rules(f, rel))
+                except OSError:
+                    continue
+        return RuleSet(self.filter, self.rules + own) if own else self
+
+    def keep_dir(self, rel):
+        m = self.dir_rx.match(rel) if self.dir_rx else None
+        return m is None or m.lastgroup[0] == 'n'
+
+    def keep_file(self, rel, rx=None):
+        rx = rx or self.file_rx
+        m = rx.match(rel) if rx else None
+        if m is not None and m.lastgroup[0] == 'i':
+            return False
+        include = self.filter.include_rx
+        return include is None or include.match(rel) is not None
+
+    def keep_path(self, rel):
+        """不经逐级剪枝直接判断任意深度的文件路径：被排除目录下的文件同样排除"""
+        if self._tree_rx is None:
+            self._tree_rx = compile_rules(self.rules + self.filter.excludes, dirs=False, subtree=True)
+        return self.keep_file(rel, self._tree_rx)
+
+class PathFilter:
+    """
+    遍历过滤器：include 全局编译一次；exclude 与默认排除目录作为根级规则；
+    启用忽略文件时每个目录的 .gitignore / .ignore 在读取该目录时并入
+    """
+
+    def __init__(self, includes=(), excludes=(), default_excludes=EXCLUDE_DIRS, ignore_files=IGNORE_FILES):
+        includes = [p for p in includes if p and p != "*"]
+        self.include_rx = compile_rules(list(parse_rules(includes)), dirs=False) if includes else None
+        self.excludes = list(parse_rules(excludes))
+        self.ignore_files = tuple(ignore_files or ())
+        self.root = RuleSet(self, list(parse_rules(d + "/" for d in default_excludes)))
+
+def scan_dir(path, depth, rel, rules=None, cached=None, apply=True):
+    """
+    在线程池中读取单个目录：返回 (子目录名, 文件条目, 目录 mtime_ns, 是否重新读取, 本级规则集)，
+    均按名称排序。文件大小与修改时间直接取自 DirEntry.stat()，不再对每个文件单独 getsize；
+    apply 为 True 时被排除的文件连 stat 都不做、被忽略的子目录直接剔除。
+    cached 为索引中的记录，目录 mtime 未变时直接复用。目录不可读时返回 None
+    """
+    dirs, files = [], []
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+        if cached is not None and cached[0] == mtime_ns:
+            files = [Entry(os.path.join(path, name), name, depth, False, size, mtime)
+                     for name, size, mtime in cached[2]]
+            if rules is not None:
+                rules = rules.enter(path, rel, {e.name for e in files})
+            return cached[1], files, mtime_ns, False, rules
+        with os.scandir(path) as it:
+            entries = list(it)
+    except OSError:
+        return None
+
+    if rules is not None:
+        rules = rules.enter(path, rel, {e.name for e in entries})
+    check = rules is not None and apply
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                if not check or rules.keep_dir(rel + entry.name):
+                    dirs.append(entry.name)
+            elif not check or rules.keep_file(rel + entry.name):
+                st = entry.stat()
+                files.append(Entry(entry.path, entry.name, depth, False, st.st_size, st.st_mtime))
+        except OSError:
+            continue
+    dirs.sort()
+    files.sort(key=lambda e: e.name)
+    return dirs, files, mtime_ns, True, rules
+
+def walk(root, max_depth=float('inf'), path_filter=None, workers=None, index=None):
+    """
+    并行遍历目录树，按确定的先序顺序 (目录、其文件、再依次进入子目录，名称升序) 产出 Entry。
+    目录读取分发到线程池，只为接下来即将访问的有限个目录预取，
+    内存占用与预取窗口成正比，与目录树大小无关。
+    path_filter (PathFilter) 过滤文件，被忽略的子目录在读取之前整棵剪掉。
+    传入 index (ScanIndex) 时增量扫描：索引保存完整目录内容，过滤在产出前进行
+    """
+    if index is not None:
+        # 索引以绝对路径为键，文件需全部记录以便之后按任意模式查询
+        root = os.path.abspath(root)
+    rules = path_filter.root if path_filter is not None else None
+    workers = workers or DEFAULT_WORKERS
+    window = workers * 4
+    pool = ThreadPoolExecutor(workers)
+    # 栈顶为下一个要访问的目录；元素为 [path, depth, future 或 None, 相对路径, 父级规则集]
+    stack = [[root, 0, None, "", rules]]
+    inflight = 0
+    try:
+        while stack:
+            # 从栈顶开始为即将访问的目录补齐预取窗口
+            for item in reversed(stack):
+                if inflight >= window:
+                    break
+                if item[2] is None:
+                    cached = index.lookup(item[0]) if index is not None else None
+                    item[2] = pool.submit(scan_dir, item[0], item[1] + 1, item[3], item[4],
+                                          cached, index is None)
+                    inflight += 1
+
+            path, depth, fut, rel, _ = stack.pop()
+            listing = fut.result()
+            inflight -= 1
+            if listing is None:
+                continue
+
+            subdirs, files, mtime_ns, fresh, level = listing
+            if index is not None:
+                if fresh:
+                    index.store(path, mtime_ns, subdirs, files)
+                if level is not None:
+                    files = [e for e in files if level.keep_file(rel + e.name)]
+                    subdirs = [d for d in subdirs if level.keep_dir(rel + d)]
+            yield Entry(path, os.path.basename(path.rstrip(os.sep)) or path, depth, True, 0, mtime_ns / 1e9)
+            yield from files
+
+            if depth + 1 < max_depth:
+                for name in reversed(subdirs):
+                    stack.append([os.path.join(path, name), depth + 1, None, f"{rel}{name}/", level])
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        if index is not None:
+            index.commit()
+
+def _partial_digest(path, size):
+    """首尾各 PARTIAL_BLOCK 字节的摘要；文件不超过两块时即为全文摘要"""
+    with open(path, "rb") as f:
+        data = f.read(PARTIAL_BLOCK)
+        if size > 2 * PARTIAL_BLOCK:
+            f.seek(-PARTIAL_BLOCK, os.SEEK_END)
+            data += f.read(PARTIAL_BLOCK)
+        elif size > PARTIAL_BLOCK:
+            data += f.read()
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+def _full_digest(path, size):
+    """完整摘要：大文件整体 mmap，一次 update 期间释放 GIL；其余复用 1 MiB 缓冲区"""
+    h = hashlib.blake2b()
+    with open(path, "rb") as f:
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                h.update(m)
+        else:
+            buf = bytearray(HASH_CHUNK)
+            view = memoryview(buf)
+            while n := f.readinto(buf):
+                h.update(view[:n])
+    return h.digest()
+
+def _inode(path, size):
+    st = os.stat(path)
+    return st.st_dev, st.st_ino
+
+def _try_key(key_fn, path, size):
+    try:
+        return key_fn(path, size)
+    except OSError:
+        return None
+
+def _refine(pool, groups, key_fn, stats=None):
+    """
+    对每组 (size, paths) 中的文件并行计算 key_fn(path, size)，按 key 再分组，
+    只保留仍有 2 个以上成员的组；读取失败的文件直接剔除
+    """
+    jobs = [(i, path, size) for i, (size, paths) in enumerate(groups) for path in paths]
+    if stats is not None:
+        stats.append(len(jobs))
+    keys = pool.map(lambda job: _try_key(key_fn, job[1], job[2]), jobs)
+    split = {}
+    for (i, path, size), key in zip(jobs, keys):
+        if key is not None:
+            split.setdefault((i, key), (size, []))[1].append(path)
+    return [g for g in split.values() if len(g[1]) > 1]
+
+def find_duplicates(entries, min_size=1, workers=None, stats=None):
+    """
+    分层查重：先按大小分组 (只用遍历时已有的 stat 结果)，
+    大小相同者去掉硬链接后比较首尾部分哈希，仍然冲突的才读取全文计算完整哈希。
+    返回按可回收空间降序排列的 [(size, [path, ...])]；stats 列表依次记录各阶段处理的文件数
+    """
+    by_size = {}
+    scanned = 0
+    for entry in entries:
+        if not entry.is_dir and entry.size >= min_size:
+            scanned += 1
+            by_size.setdefault(entry.size, []).append(entry.path)
+    groups = [(size, paths) for size, paths in by_size.items() if len(paths) > 1]
+    del by_size
+    if stats is not None:
+        stats.append(scanned)
+
+    with ThreadPoolExecutor(workers or DEFAULT_WORKERS) as pool:
+        # 同一 inode 的硬链接不占额外空间，每个 inode 只保留一个路径
+        jobs = [(i, path, size) for i, (size, paths) in enumerate(groups) for path in paths]
+        keys = pool.map(lambda job: _try_key(_inode, job[1], job[2]), jobs)
+        inodes = [{} for _ in groups]
+        for (i, path, _), key in zip(jobs, keys):
+            if key is not None:
+                inodes[i].setdefault(key, path)
+        linked = [(size, list(seen.values())) for (size, _), seen in zip(groups, inodes) if len(seen) > 1]
+        groups = _refine(pool, linked, _partial_digest, stats)
+        # 不超过两块的文件部分哈希即覆盖全文，无需再读
+        done = [g for g in groups if g[0] <= 2 * PARTIAL_BLOCK]
+        groups = done + _refine(pool, [g for g in groups if g[0] > 2 * PARTIAL_BLOCK], _full_digest, stats)
+
+    for _, paths in groups:
+        paths.sort()
+    groups.sort(key=lambda g: (-g[0] * (len(g[1]) - 1), g[1][0]))
+    return groups
+
+def push_bounded(heap, item, n):
+    """维护最多 n 个最大元素的小顶堆，返回被挤出的元素 (未挤出时为 None)"""
+    if len(heap) < n:
+        heapq.heappush(heap, item)
+        return None
+    if heap and item > heap[0]:
+        return heapq.heapreplace(heap, item)
+    return item
+
+class DirNode:
+    """空间占用树的节点：size / files 为整棵子树的合计，children 只保留最大的若干子目录"""
+    __slots__ = ("path", "name", "depth", "size", "files", "children", "rest", "rest_size")
+
+    def __init__(self, entry):
+        self.path = entry.path
+        self.name = entry.name
+        self.depth = entry.depth
+        self.size = 0
+        self.files = 0
+        self.children = []
+        self.rest = 0
+        self.rest_size = 0
+
+def disk_usage(entries, top=10, tree_depth=2):
+    """
+    单次遍历自底向上汇总目录大小。遍历为先序，出现深度为 d 的目录时，
+    栈中深度不小于 d 的目录均已遍历完毕，即可把合计并入父目录。
+    全局最大的目录 / 文件放在容量为 top 的堆中；只有 tree_depth 以内的节点保留子树，
+    内存为 O(top^tree_depth + 当前深度)，与文件总数无关。
+    返回 (根节点, 最大目录 [(size, path)], 最大文件 [(size, path)])
+    """
+    stack = []
+    top_dirs, top_files = [], []
+    root = None
+
+    def close(node):
+        push_bounded(top_dirs, (node.size, node.path), top)
+        if not stack:
+            return
+        parent = stack[-1]
+        parent.size += node.size
+        parent.files += node.files
+        if node.depth <= tree_depth:
+            evicted = push_bounded(parent.children, (node.size, node.path, node), top)
+            if evicted:
+                parent.rest += 1
+                parent.rest_size += evicted[0]
+        else:
+            parent.rest += 1
+            parent.rest_size += node.size
+
+    for entry in entries:
+        if entry.is_dir:
+            while len(stack) > entry.depth:
+                close(stack.pop())
+            node = DirNode(entry)
+            if root is None:
+                root = node
+            stack.append(node)
+        else:
+            node = stack[-1]
+            node.size += entry.size
+            node.files += 1
+            push_bounded(top_files, (entry.size, entry.path), top)
+    while stack:
+        close(stack.pop())
+
+    return root, sorted(top_dirs, reverse=True), sorted(top_files, reverse=True)
+
+def format_size(size):
+    return f"{size/1024:.1f} KB" if size < 1024*1024 else f"{size/1024/1024:.1f} MB"
+
 def run_explorer(args, tools):
     import questionary
     Fore = tools.get("Fore")
 
     # 1. 交互式参数配置
-    root_path = questionary.text("输入要遍历的根目录:", default=".").ask()
+    root_path = getattr(args, 'path', None) or questionary.text("输入要遍历的根目录:", default=".").ask()
+    if not root_path: return
     if not os.path.exists(root_path):
         print(f"{Fore.RED}❌ 路径不存在！")
         return
 
-    pattern = questionary.text("文件匹配模式 (如 *.py, *test*):", default="*").ask()
-    max_depth = questionary.text("最大遍历深度 (留空为无限):", default="").ask()
-    max_depth = int(max_depth) if max_depth.isdigit() else float('inf')
+    mode = "du" if getattr(args, 'du', False) else "dupes" if getattr(args, 'dupes', False) else "tree"
+    if not getattr(args, 'path', None) and not getattr(args, 'query', False):
+        mode = questionary.select("扫描模式:", choices=[
+            questionary.Choice("目录树", value="tree"),
+            questionary.Choice("查找重复文件", value="dupes"),
+            questionary.Choice("空间占用分析", value="du"),
+        ]).ask()
+        if not mode: return
+
+    # 命令行给出路径即为非交互模式：未指定的匹配模式与深度取默认值 (全部文件、不限深度)，不再提问
+    pattern = getattr(args, 'pattern', None)
+    max_depth = getattr(args, 'max_depth', None)
+    if getattr(args, 'path', None):
+        pattern = pattern or "*"
+        if max_depth is None:
+            max_depth = float('inf')
+    if not pattern:
+        pattern = questionary.text("文件匹配模式 (如 *.py, *test*):", default="*").ask()
+    if max_depth is None:
+        max_depth = questionary.text("最大遍历深度 (留空为无限):", default="").ask()
+        max_depth = int(max_depth) if max_depth and max_depth.isdigit() else float('inf')
+
+    # 导出设置
+    fmt = getattr(args, 'format', None)
+    output = getattr(args, 'output', None)
+    if fmt is None and output:
+        fmt = "jsonl"
+    if mode == "du":
+        # 空间占用只输出汇总报告
+        if fmt or output:
+            print(f"{Fore.YELLOW}⚠️ 空间占用模式不支持导出，已忽略 --format / -o")
+        fmt = output = None
+    elif fmt is None and not getattr(args, 'path', None):
+        fmt = questionary.select("导出文件列表:", choices=["不导出", *EXPORT_FORMATS]).ask()
+        if fmt == "不导出":
+            fmt = None
+        elif fmt:
+            output = questionary.text("导出文件路径:", default=f"scan_result.{'txt' if fmt == 'nul' else fmt}").ask()
+            if not output: return
+
+    # 空间占用要统计全部内容：默认排除目录与忽略文件不生效，只应用显式的 include / exclude
+    path_filter = PathFilter(
+        [pattern, *(getattr(args, 'include', None) or [])],
+        getattr(args, 'exclude', None) or [],
+        default_excludes=() if mode == "du" else EXCLUDE_DIRS,
+        ignore_files=() if getattr(args, 'no_ignore', False) or mode == "du" else IGNORE_FILES)
+
+    index_path = getattr(args, 'index', None)
+    query = getattr(args, 'query', False)
+    if query and not os.path.exists(index_path or DEFAULT_INDEX):
+        print(f"{Fore.RED}❌ 索引不存在，请先使用 --index 扫描: {index_path or DEFAULT_INDEX}")
+        return
+    index = None
+    if index_path and not query:
+        try:
+            index = ScanIndex(index_path)
+        except (OSError, sqlite3.Error) as e:
+            print(f"{Fore.RED}❌ 无法打开索引: {e}")
+            return
+
+    sink = None
+    if fmt:
+        try:
+            sink = ListingSink(fmt, output, DUPE_FIELDS if mode == "dupes" else EXPORT_FIELDS)
+        except OSError as e:
+            print(f"{Fore.RED}❌ 无法写入导出文件: {e}")
+            return
+    log = sink.log if sink else sys.stdout
+    # 列表写到标准输出或显式 --quiet 时不打印目录树
+    show_tree = not getattr(args, 'quiet', False) and log is sys.stdout
+
+    try:
+        if query:
+            run_query(args, Fore, root_path, pattern, path_filter, index_path or DEFAULT_INDEX, sink, show_tree)
+        elif mode == "dupes":
+            run_dupes(args, Fore, root_path, path_filter, max_depth, index, sink)
+        elif mode == "du":
+            run_du(args, Fore, root_path, path_filter, max_depth, index)
+        else:
+            run_walk(args, Fore, root_path, pattern, path_filter, max_depth, index, sink, show_tree)
+    finally:
+        if sink:
+            sink.close()
+    if sink and sink.to_file:
+        print(f"{Fore.CYAN}📁 {sink.count} 条结果已保存至 {output}")
+
+def run_walk(args, Fore, root_path, pattern, path_filter, max_depth, index, sink, show_tree):
+    """遍历模式：目录树打印与导出在同一次遍历中完成"""
+    log = sink.log if sink else sys.stdout
 
-    exclude_dirs = [".git", "__pycache__", ".venv", "node_modules", ".idea", ".vscode"]
-    
     # 2. 遍历核心逻辑
-    print(f"\n{Fore.CYAN}🔍 正在扫描: {Fore.WHITE}{os.path.abspath(root_path)}")
-    print(f"{Fore.CYAN}规则: {Fore.WHITE}Pattern={pattern}, MaxDepth={max_depth}")
-    print("-" * 65)
+    print(f"\n{Fore.CYAN}🔍 正在扫描: {Fore.WHITE}{os.path.abspath(root_path)}", file=log)
+    print(f"{Fore.CYAN}规则: {Fore.WHITE}Pattern={pattern}, MaxDepth={max_depth}", file=log)
+    print("-" * 65, file=log)
 
     file_count = 0
     dir_count = 0
     total_size = 0
     start_time = time.time()
 
-    # 规范化初始路径深度
-    base_depth = root_path.rstrip(os.sep).count(os.sep)
+    entries = walk(root_path, max_depth, path_filter,
+                   workers=getattr(args, 'workers', None), index=index)
+    try:
+        for entry in entries:
+            # 计算树状前缀
+            indent = "  " * entry.depth
+            if entry.is_dir:
+                if show_tree:
+                    print(f"{Fore.BLUE}{indent}📁 {entry.name}/")
+                dir_count += 1
+                continue
 
-    for root, dirs, files in os.walk(root_path):
-        # 计算当前深度
-        current_depth = root.count(os.sep) - base_depth
-        if current_depth >= max_depth:
-            dirs[:] = [] # 停止向深层遍历
-            continue
+            total_size += entry.size
+            file_count += 1
+            if sink:
+                sink.write(entry)
+            if show_tree:
+                # 格式化显示：深度 + 文件名 + 大小 (文件条目深度比所在目录多 1)
+                print(f"{Fore.WHITE}{indent}📄 {entry.name:<30} {Fore.YELLOW}({format_size(entry.size)})")
+    except KeyboardInterrupt:
+        print(f"\n{Fore.YELLOW}⚠️ 用户中断。", file=sys.stderr)
+    finally:
+        entries.close()
+        if index is not None:
+            index.close()
 
-        # 过滤掉不需要的目录（原地修改 dirs 影响后续 walk）
-        dirs[:] = [d for d in dirs if d not in exclude_dirs]
+    # 3. 统计报告
+    duration = time.time() - start_time
+    print("-" * 65, file=log)
+    print(f"{Fore.GREEN}✅ 扫描完成！", file=log)
+    if index is not None:
+        print(f"{Fore.CYAN}索引: {Fore.WHITE}{index.path}", file=log)
+    print(f"统计: {dir_count} 目录 | {file_count} 文件 | 总计 {total_size/1024/1024:.2f} MB", file=log)
+    print(f"耗时: {duration:.2f}s", file=log)
 
-        # 计算树状前缀
-        indent = "  " * current_depth
-        folder_name = os.path.basename(root) or root
-        print(f"{Fore.BLUE}{indent}📁 {folder_name}/")
+def run_query(args, Fore, root_path, pattern, path_filter, index_path, sink, show_tree):
+    """
+    查询模式：按模式与大小条件直接从索引取结果，不访问文件系统
+    (include / exclude 规则照常生效，各目录的忽略文件不参与)
+    """
+    log = sink.log if sink else sys.stdout
+    try:
+        min_size = parse_size(args.min_size) if getattr(args, 'min_size', None) else None
+        max_size = parse_size(args.max_size) if getattr(args, 'max_size', None) else None
+    except ValueError:
+        print(f"{Fore.RED}❌ 大小格式错误，示例: 512, 10K, 1.5M, 2G", file=log)
+        return
 
-        for file in files:
-            if fnmatch(file, pattern):
-                file_path = os.path.join(root, file)
-                try:
-                    f_size = os.path.getsize(file_path)
-                    total_size += f_size
-                    file_count += 1
-                    
-                    # 格式化显示：深度 + 文件名 + 大小
-                    size_str = f"({f_size/1024:.1f} KB)" if f_size < 1024*1024 else f"({f_size/1024/1024:.1f} MB)"
-                    print(f"{Fore.WHITE}{indent}  📄 {file:<30} {Fore.YELLOW}{size_str}")
-                except OSError:
-                    continue
-        
-        dir_count += 1
+    print(f"\n{Fore.CYAN}🔎 索引查询: {Fore.WHITE}{os.path.abspath(root_path)}", file=log)
+    print(f"{Fore.CYAN}规则: {Fore.WHITE}Pattern={pattern}, Size=[{min_size or 0}, {max_size or '∞'}]", file=log)
+    print("-" * 65, file=log)
 
-    # 3. 统计报告
-    duration = time.time() - start_time
+    file_count = 0
+    total_size = 0
+    start_time = time.time()
+    index = ScanIndex(index_path)
+    try:
+        for entry in index.query(root_path, path_filter.root.keep_path, min_size, max_size):
+            total_size += entry.size
+            file_count += 1
+            if sink:
+                sink.write(entry)
+            if show_tree:
+                print(f"{Fore.WHITE}📄 {entry.path:<50} {Fore.YELLOW}({format_size(entry.size)})")
+    except KeyboardInterrupt:
+        print(f"\n{Fore.YELLOW}⚠️ 用户中断。", file=sys.stderr)
+    finally:
+        index.close()
+
+    print("-" * 65, file=log)
+    print(f"统计: {file_count} 文件 | 总计 {total_size/1024/1024:.2f} MB", file=log)
+    print(f"耗时: {time.time() - start_time:.2f}s", file=log)
+
+def run_dupes(args, Fore, root_path, path_filter, max_depth, index, sink):
+    """查重模式：遍历只收集大小，逐级缩小需要读取内容的文件范围"""
+    log = sink.log if sink else sys.stdout
+    try:
+        min_size = parse_size(args.min_size) if getattr(args, 'min_size', None) else 1
+    except ValueError:
+        print(f"{Fore.RED}❌ 大小格式错误，示例: 512, 10K, 1.5M, 2G", file=log)
+        return
+
+    print(f"\n{Fore.CYAN}🧬 查找重复文件: {Fore.WHITE}{os.path.abspath(root_path)}", file=log)
+    print("-" * 65, file=log)
+
+    start_time = time.time()
+    stats = []
+    workers = getattr(args, 'workers', None)
+    entries = walk(root_path, max_depth, path_filter, workers=workers, index=index)
+    try:
+        groups = find_duplicates(entries, min_size, workers, stats)
+    except KeyboardInterrupt:
+        print(f"\n{Fore.YELLOW}⚠️ 用户中断。", file=sys.stderr)
+        return
+    finally:
+        entries.close()
+        if index is not None:
+            index.close()
+
+    wasted = 0
+    for size, paths in groups:
+        wasted += size * (len(paths) - 1)
+        if sink:
+            sink.write_group(size, paths)
+        if log is sys.stdout:
+            print(f"{Fore.YELLOW}{len(paths)} 份 × {format_size(size)} {Fore.WHITE}可回收 {format_size(size * (len(paths) - 1))}", file=log)
+            for path in paths:
+                print(f"  {Fore.WHITE}📄 {path}", file=log)
+
+    # 各阶段实际处理的文件数：体现有多少文件仅凭 stat 就被排除
+    scanned, partial, full = (stats + [0, 0, 0])[:3]
+    print("-" * 65, file=log)
+    print(f"{Fore.GREEN}✅ 查重完成！", file=log)
+    print(f"筛选: {scanned} 文件 → 部分哈希 {partial} → 完整哈希 {full}", file=log)
+    print(f"统计: {len(groups)} 组重复 | 可回收 {wasted/1024/1024:.2f} MB", file=log)
+    print(f"耗时: {time.time() - start_time:.2f}s", file=log)
+
+def print_usage_tree(node, Fore, parent_size=None):
+    """按大小降序打印保留下来的子树，未展开的子目录合并为一行"""
+    indent = "  " * node.depth
+    share = f" {node.size / parent_size * 100:5.1f}%" if parent_size else ""
+    print(f"{Fore.BLUE}{indent}📁 {node.name + '/':<30} {Fore.YELLOW}{format_size(node.size):>10}"
+          f"{Fore.WHITE}{share}  ({node.files} 文件)")
+    for _, _, child in sorted(node.children, reverse=True):
+        print_usage_tree(child, Fore, node.size)
+    if node.rest:
+        print(f"{Fore.WHITE}{indent}  … 其余 {node.rest} 个子目录 {format_size(node.rest_size)}")
+
+def run_du(args, Fore, root_path, path_filter, max_depth, index):
+    """空间占用模式：一次遍历完成汇总，显示深度由 --max-depth 控制 (默认 2)"""
+    top = max(1, getattr(args, 'top', None) or 10)
+    tree_depth = 2 if max_depth == float('inf') else max_depth
+
+    print(f"\n{Fore.CYAN}📊 空间占用: {Fore.WHITE}{os.path.abspath(root_path)}")
+    print(f"{Fore.CYAN}规则: {Fore.WHITE}Top={top}, TreeDepth={tree_depth} (表观大小)")
+    print("-" * 65)
+
+    start_time = time.time()
+    entries = walk(root_path, path_filter=path_filter, workers=getattr(args, 'workers', None), index=index)
+    try:
+        root, top_dirs, top_files = disk_usage(entries, top, tree_depth)
+    except KeyboardInterrupt:
+        print(f"\n{Fore.YELLOW}⚠️ 用户中断。", file=sys.stderr)
+        return
+    finally:
+        entries.close()
+        if index is not None:
+            index.close()
+    if root is None:
+        print(f"{Fore.RED}❌ 目录无法读取。")
+        return
+
+    print_usage_tree(root, Fore)
+    print("-" * 65)
+    print(f"{Fore.CYAN}🔝 最大的 {len(top_dirs)} 个目录:")
+    for size, path in top_dirs:
+        print(f"  {Fore.YELLOW}{format_size(size):>10}  {Fore.WHITE}{path}")
+    print(f"{Fore.CYAN}🔝 最大的 {len(top_files)} 个文件:")
+    for size, path in top_files:
+        print(f"  {Fore.YELLOW}{format_size(size):>10}  {Fore.WHITE}{path}")
     print("-" * 65)
-    print(f"{Fore.GREEN}✅ 扫描完成！")
-    print(f"统计: {dir_count} 目录 | {file_count} 文件 | 总计 {total_size/1024/1024:.2f} MB")
-    print(f"耗时: {duration:.2f}s")
-
-    # 4. 可选导出功能
-    if file_count > 0 and questionary.confirm("是否将文件列表导出为 txt?").ask():
-        with open("scan_result.txt", "w", encoding="utf-8") as f:
-            f.write(f"Scan Report - {time.ctime()}\n")
-            f.write(f"Target: {os.path.abspath(root_path)}\n\n")
-            # 这里可以重新运行一遍简单的逻辑来写入文件...
-            f.write("Scan successful.")
-        print(f"{Fore.CYAN}📁 结果已保存至 scan_result.txt")
+    print(f"{Fore.GREEN}✅ 统计完成！")
+    print(f"统计: {root.files} 文件 | 总计 {root.size/1024/1024:.2f} MB")
+    print(f"耗时: {time.time() - start_time:.2f}s")
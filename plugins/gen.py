@@ -1,6 +1,7 @@
+import os
 import string
-import random
-import uuid
+import sys
+import time
 
 __info__ = {
     "help": "随机密码/UUID/文本生成器",
@@ -11,16 +12,120 @@ __info__ = {
     "depends": []
 }
 
+ALPHABETS = {
+    "pwd": string.ascii_letters + string.digits + "!@#$%^&*",
+    "str": string.ascii_letters + string.digits,
+}
+BATCH_BYTES = 1 << 20       # 每批输出约 1MB
+UUID_COLUMNS = [c for c in range(36) if c not in (8, 13, 18, 23)]
+UUID_TEMPLATE = b"00000000-0000-0000-0000-000000000000\n"
+# UUIDv4 的版本位 (第 6 字节高 4 位 = 0100) 与变体位 (第 8 字节高 2 位 = 10) 查表改写
+_UUID_VERSION = bytes((b & 0x0F) | 0x40 for b in range(256))
+_UUID_VARIANT = bytes((b & 0x3F) | 0x80 for b in range(256))
+
 def setup_args(parser):
     parser.add_argument("type", choices=["pwd", "uuid", "str"], nargs="?", help="生成类型")
     parser.add_argument("--len", type=int, default=16, help="生成长度")
+    parser.add_argument("--count", type=int, help="批量生成的数量，每行一个 (默认只生成一个并复制到剪贴板)")
+    parser.add_argument("-o", "--output", help="批量结果写入文件 (默认标准输出)")
+
+def _alphabet_tables(alphabet):
+    """
+    为 bytes.translate 构造拒绝采样表：只保留 < limit (alphabet 长度的整数倍) 的字节，
+    再按 b % n 映射到字符，避免取模偏差；一次 translate 在 C 层完成过滤与映射
+    """
+    n = len(alphabet)
+    limit = 256 - 256 % n
+    table = bytes(ord(alphabet[b % n]) for b in range(256))
+    return table, bytes(range(limit, 256)), limit
+
+def draw_chars(need, table, delete, limit):
+    """从 os.urandom 成块取熵，返回 need 个均匀分布的字母表字符"""
+    out = bytearray()
+    while len(out) < need:
+        # 按接受率多取一点，通常一次 urandom 就够
+        missing = need - len(out)
+        out += os.urandom(missing * 256 // limit + 64).translate(table, delete)
+    del out[need:]
+    return out
+
+def _lay_out(out, src, width, stride, columns=None):
+    """
+    把 src 中每 width 字节一个的值写入每行 stride 字节的 out 中，columns 为各字节在行内的位置
+    (None 表示从行首连续存放)。逐列步长拷贝，每列一次切片赋值；
+    连续存放且值的个数少于列数时改为逐行拷贝，循环次数取两者中较少的
+    """
+    count = len(src) // width
+    if columns is None:
+        if count < width:
+            for i in range(count):
+                out[i * stride:i * stride + width] = src[i * width:(i + 1) * width]
+            return
+        columns = range(width)
+    for j, c in enumerate(columns):
+        out[c::stride] = src[j::width]
+
+def generate(kind, length=16, count=1):
+    """按批生成 count 个值，每批产出一段以换行分隔的 bytes"""
+    if kind == "uuid":
+        batch = max(1, BATCH_BYTES // len(UUID_TEMPLATE))
+        while count > 0:
+            n = min(batch, count)
+            raw = bytearray(os.urandom(16 * n))
+            raw[6::16] = raw[6::16].translate(_UUID_VERSION)
+            raw[8::16] = raw[8::16].translate(_UUID_VARIANT)
+            out = bytearray(UUID_TEMPLATE * n)
+            _lay_out(out, raw.hex().encode(), 32, len(UUID_TEMPLATE), UUID_COLUMNS)
+            yield bytes(out)
+            count -= n
+        return
+
+    table, delete, limit = _alphabet_tables(ALPHABETS[kind])
+    stride = length + 1
+    batch = max(1, BATCH_BYTES // stride)
+    while count > 0:
+        n = min(batch, count)
+        out = bytearray(stride * n)
+        out[length::stride] = b"\n" * n
+        _lay_out(out, draw_chars(length * n, table, delete, limit), length, stride)
+        yield bytes(out)
+        count -= n
+
+def run_bulk(args, Fore, g_type, length, count):
+    """批量生成并经缓冲写入文件或标准输出，写到标准输出时统计信息改走 stderr"""
+    output = getattr(args, 'output', None)
+    log = sys.stdout if output else sys.stderr
+    start = time.time()
+    dst = None
+    try:
+        dst = open(output, "wb") if output else sys.stdout.buffer
+        for chunk in generate(g_type, length, count):
+            dst.write(chunk)
+    except OSError as e:
+        print(f"{Fore.RED}执行失败: {e}", file=log)
+        return
+    except KeyboardInterrupt:
+        print(f"\n{Fore.YELLOW}⚠️ 用户中断。", file=sys.stderr)
+        return
+    finally:
+        if dst is not None:
+            dst.close() if output else dst.flush()
+
+    elapsed = max(time.time() - start, 1e-9)
+    print(f"{Fore.CYAN}✨ 已生成 {count} 个 | {elapsed:.2f}s | {count / elapsed:,.0f} 个/秒", file=log)
+    if output:
+        print(f"{Fore.CYAN}📁 结果已保存至 {output}", file=log)
 
 def run_gen(args, tools):
     import questionary
     Fore = tools["Fore"]
+    Style = tools.get("Style")
+    count = getattr(args, 'count', None)
+    # 批量结果写到标准输出时，提示信息改走 stderr，保证输出可直接重定向
+    log = sys.stderr if count and not getattr(args, 'output', None) else sys.stdout
+
+    print(f"{Fore.CYAN}🎲 DevBox Generator - 随机内容生成", file=log)
 
-    print(f"{Fore.CYAN}🎲 DevBox Generator - 随机内容生成")
-    
     g_type = getattr(args, 'type', None)
     if not g_type:
         g_type = questionary.select(
@@ -31,25 +136,28 @@ def run_gen(args, tools):
                 questionary.Choice("📝 随机字符串 (String)", "str")
             ]
         ).ask()
+        if not g_type:
+            return
 
-    if g_type == "uuid":
-        res = str(uuid.uuid4())
-    elif g_type == "pwd":
-        chars = string.ascii_letters + string.digits + "!@#$%^&*"
-        length = getattr(args, 'len', 16)
-        res = "".join(random.choice(chars) for _ in range(length))
-    else:
-        length = getattr(args, 'len', 16)
-        res = "".join(random.choice(string.ascii_letters + string.digits) for _ in range(length))
+    length = getattr(args, 'len', 16)
+    if length < 1 or (count is not None and count < 1):
+        print(f"{Fore.RED}⚠️ --len 与 --count 必须为正整数", file=log)
+        return
+
+    if count:
+        run_bulk(args, Fore, g_type, length, count)
+        return
+
+    res = next(generate(g_type, length)).decode().rstrip("\n")
 
     print("-" * 62)
-    print(f"生成结果:\n{Fore.GREEN}{Style.BRIGHT if 'Style' in tools else ''}{res}")
+    print(f"生成结果:\n{Fore.GREEN}{Style.BRIGHT if Style else ''}{res}")
     print("-" * 62)
-    
+
     # 自动尝试复制到剪贴板
     try:
         import pyperclip
         pyperclip.copy(res)
         print(f"{Fore.WHITE}(已自动复制到剪贴板)")
     except:
-        pass
\ No newline at end of file
+        pass
@@ -1,8 +1,23 @@
 import asyncio
+import base64
+import csv
+import errno
+import heapq
+import ipaddress
+import itertools
+import json
+import os
+import re
+import selectors
 import socket
+import ssl
 import time
 import sys
-from urllib.request import Request, urlopen
+import types
+import zlib
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
 __info__ = {
     "help": "端口扫描",
@@ -32,145 +47,1233 @@ PORT_PRESETS = {
     }
 }
 
-def render_progress(current, total, Fore):
-    """单行渲染进度条"""
-    percent = (current / total) * 100
-    length = 40
-    fill = int(percent / (100 / length))
-    bar = f"{Fore.GREEN}{'█' * fill}{Fore.RESET}{'░' * (length - fill)}"
-    sys.stdout.write(f"\r\033[K  {Fore.CYAN}进度: {Fore.WHITE}[{bar}] {percent:.1f}% ({current}/{total})")
-    sys.stdout.flush()
+# 导出结果的字段顺序 (jsonl / csv)
+RESULT_FIELDS = ("host", "port", "service", "info", "link")
 
-async def probe_web_service(target, port):
+# 非阻塞 connect 正在进行中的返回码 (Windows 下为 WSAEWOULDBLOCK)
+_CONNECT_PENDING = {errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY, 10035}
+# 对端明确拒绝 (RST) 同样是一次完整的往返，可作为 RTT 样本
+_CONNECT_REFUSED = {errno.ECONNREFUSED, 10061}
+# 文件描述符耗尽，及单个任务因此重试的次数上限 (描述符可能被进程内其他部分长期占用)
+_FD_EXHAUSTED = {errno.EMFILE, errno.ENFILE}
+FD_RETRIES = 20
+
+# 静默端口优先按 TLS 探测的常见端口，其余端口优先按明文 HTTP 探测
+TLS_PORTS = {443, 465, 636, 853, 993, 995, 2376, 5986, 6443, 8443, 9443}
+
+_TITLE_RE = re.compile(rb"<title[^>]*>(.*?)</title>", re.I | re.S)
+# 对端拒绝协议的标志：明文请求收到 TLS Alert 记录，或 Web 服务提示需要 HTTPS
+_TLS_HINT_RE = re.compile(rb"^\x15\x03|plain HTTP request was sent to HTTPS|speak(ing)? plain HTTP to an SSL", re.I)
+# start_tls / 明文探测被对端作废时的标记
+_WRONG_PROTOCOL = object()
+_TLS_CONTEXT = None
+
+# 服务指纹库: (服务类型, 产品名, 正则)，正则中可用 (?P<v>...) 捕获版本号。
+# 同一位置上排在前面的条目优先，具体产品需写在通用协议之前
+FINGERPRINTS = [
+    ("SSH", "OpenSSH", rb"\ASSH-[\d.]+-OpenSSH[_-](?P<v>[\w.]+)"),
+    ("SSH", "Dropbear", rb"\ASSH-[\d.]+-dropbear_(?P<v>[\w.]+)"),
+    ("SSH", "SSH", rb"\ASSH-(?P<v>[\d.]+)-"),
+    ("FTP", "vsFTPd", rb"\A220[ -][^\r\n]*?vsFTPd (?P<v>[\d.]+)"),
+    ("FTP", "ProFTPD", rb"\A220[ -][^\r\n]*?ProFTPD (?P<v>[\d.]+)"),
+    ("FTP", "FileZilla Server", rb"\A220[ -][^\r\n]*?FileZilla Server (?:version )?(?P<v>[\d.]+)"),
+    ("FTP", "Pure-FTPd", rb"\A220[ -][^\r\n]*?Pure-FTPd"),
+    ("SMTP", "Postfix", rb"\A220[ -][^\r\n]*?ESMTP Postfix"),
+    ("SMTP", "Exim", rb"\A220[ -][^\r\n]*?Exim (?P<v>[\d.]+)"),
+    ("SMTP", "Microsoft ESMTP", rb"\A220[ -][^\r\n]*?Microsoft ESMTP MAIL Service"),
+    ("FTP", "FTP", rb"\A220[ -][^\r\n]*?FTP"),
+    ("SMTP", "SMTP", rb"\A220[ -][^\r\n]*?E?SMTP"),
+    ("POP3", "Dovecot", rb"\A\+OK[^\r\n]*?Dovecot"),
+    ("POP3", "POP3", rb"\A\+OK"),
+    ("IMAP", "Dovecot", rb"\A\* OK[^\r\n]*?Dovecot"),
+    ("IMAP", "IMAP", rb"\A\* OK[^\r\n]*?IMAP"),
+    ("MYSQL", "MariaDB", rb"\A.{3}\x00\x0a(?:5\.5\.5-)?(?P<v>[\d.]+)-MariaDB"),
+    ("MYSQL", "MySQL", rb"\A.{3}\x00\x0a(?P<v>\d[\w.-]*)\x00"),
+    ("POSTGRESQL", "PostgreSQL", rb"\AE\x00\x00..S(?:FATAL|ERROR)"),
+    ("REDIS", "Redis", rb"\A-(?:ERR|NOAUTH|DENIED|WRONGPASS) "),
+    ("MEMCACHED", "Memcached", rb"\A(?:CLIENT_)?ERROR\r\n"),
+    ("MONGODB", "MongoDB", rb"access MongoDB over HTTP on the native driver port"),
+    ("VNC", "VNC", rb"\ARFB (?P<v>\d{3}\.\d{3})"),
+    ("TELNET", "Telnet", rb"\A\xff[\xfb-\xfe]"),
+    ("AMQP", "AMQP", rb"\AAMQP"),
+    ("HTTP", "openresty", rb"\r\n(?i:server): openresty(?:/(?P<v>[\d.]+))?"),
+    ("HTTP", "nginx", rb"\r\n(?i:server): nginx(?:/(?P<v>[\d.]+))?"),
+    ("HTTP", "Tengine", rb"\r\n(?i:server): Tengine(?:/(?P<v>[\d.]+))?"),
+    ("HTTP", "Apache", rb"\r\n(?i:server): Apache(?:/(?P<v>[\d.]+))?"),
+    ("HTTP", "IIS", rb"\r\n(?i:server): Microsoft-IIS/(?P<v>[\d.]+)"),
+    ("HTTP", "lighttpd", rb"\r\n(?i:server): lighttpd(?:/(?P<v>[\d.]+))?"),
+    ("HTTP", "Caddy", rb"\r\n(?i:server): Caddy"),
+    ("HTTP", "Jetty", rb"\r\n(?i:server): Jetty\((?P<v>[^)\r\n]+)\)"),
+    ("HTTP", "Kestrel", rb"\r\n(?i:server): Kestrel"),
+    ("HTTP", "gunicorn", rb"\r\n(?i:server): gunicorn(?:/(?P<v>[\d.]+))?"),
+    ("HTTP", "uvicorn", rb"\r\n(?i:server): uvicorn"),
+    ("HTTP", "Werkzeug", rb"\r\n(?i:server): Werkzeug/(?P<v>[\d.]+)"),
+    ("HTTP", "Elasticsearch", rb"\"tagline\" ?: ?\"You Know, for Search\""),
+]
+
+_FINGERPRINT_RE = None
+_FINGERPRINT_INDEX = {}
+_SERVICES = None
+_SERVICES_COMPLETE = False
+
+# 多进程分片：每个分片为位图下标上的一段连续区间 (可跨越多个主机)，须为 8 的倍数
+SHARD_SIZE = 4096
+# 仅连接探测时单次 select 的最长等待 (秒)，决定中断请求的响应延迟
+SWEEP_TICK = 0.1
+
+def setup_args(parser):
+    """定义命令行参数模式；同时给出目标与端口即进入非交互模式 (适合 cron / 管道)"""
+    parser.add_argument("target", nargs="?", help="目标: IP/域名、CIDR、地址范围或 @主机列表文件")
+    parser.add_argument("-p", "--ports", help="端口表达式，如 22,80,8000-8100")
+    parser.add_argument("--format", choices=["text", "jsonl", "csv"], default="text", help="结果输出格式")
+    parser.add_argument("-o", "--output", help="结果输出文件 (默认标准输出)")
+    parser.add_argument("--connect-only", action="store_true", default=None, help="仅探测端口开放，跳过服务识别")
+    parser.add_argument("--workers", type=int, help="扫描进程数 (默认按任务量自动决定)")
+    parser.add_argument("--concurrency", type=int, default=500, help="单进程初始在途连接数")
+    parser.add_argument("--checkpoint", help="定期把扫描进度写入该文件，中断后可续扫")
+    parser.add_argument("--resume", help="从检查点文件继续未完成的扫描 (忽略目标与端口参数)")
+
+def parse_targets(target_input):
     """
-    通用 Web 探测：不依赖端口号，通过协议头判断是否为 Web 服务
-    返回: (info_str, link_url_or_None)
+    解析目标表达式，返回去重后保持原顺序的主机列表
+    支持 (逗号或空白分隔): 域名/IP、CIDR (10.0.0.0/24)、
+    地址范围 (10.0.0.1-10.0.0.50 或 10.0.0.1-50)、主机列表文件 (@hosts.txt)
     """
-    # 优先尝试 HTTPS，再尝试 HTTP
-    protocols = [("https", 443), ("http", 80)] if port == 443 else [("http", 80), ("https", 443)]
-    
-    for prot, _ in protocols:
-        url = f"{prot}://{target}:{port}" if port not in [80, 443] else f"{prot}://{target}"
-        try:
-            def fetch():
-                req = Request(url, headers={'User-Agent': 'CLI-Kit/1.0'})
-                with urlopen(req, timeout=1.2) as res:
-                    content = res.read(1024).decode('utf-8', errors='ignore')
-                    title = "N/A"
-                    if "<title>" in content.lower():
-                        title = content.split("<title>")[1].split("</title>")[0].strip()
-                        title = " ".join(title.split())[:20]
-                    server = res.headers.get('Server', 'Unk')[:10]
-                    return f"{res.getcode()} | {server} | {title}", url
-            
-            return await asyncio.get_event_loop().run_in_executor(None, fetch)
-        except:
+    hosts = {}
+    for item in target_input.replace(',', ' ').split():
+        if item.startswith('@'):
+            with open(item[1:], 'r', encoding='utf-8') as f:
+                lines = [line.split('#')[0].strip() for line in f]
+            hosts.update(dict.fromkeys(parse_targets(" ".join(lines))))
+        elif '/' in item:
+            net = ipaddress.ip_network(item, strict=False)
+            # /31、/32 等没有广播地址的网段 hosts() 可能为空，此时扫描全部地址
+            addrs = list(net.hosts()) or list(net)
+            hosts.update(dict.fromkeys(str(a) for a in addrs))
+        elif '-' in item and item.split('-')[0].count('.') == 3:
+            first, last = item.split('-', 1)
+            start = ipaddress.ip_address(first)
+            if '.' not in last:
+                last = first.rsplit('.', 1)[0] + '.' + last
+            end = ipaddress.ip_address(last)
+            hosts.update(dict.fromkeys(str(ipaddress.ip_address(i)) for i in range(int(start), int(end) + 1)))
+        else:
+            hosts[item] = None
+    return list(hosts)
+
+def parse_ports(port_input):
+    """
+    解析端口表达式 (如 "22,80,8000-8100")
+    返回去重、升序的 array('H')，全端口也只占 128KB，不会生成 65535 个 int 列表
+    """
+    flags = bytearray(65536)
+    for part in port_input.split(','):
+        part = part.strip()
+        if not part:
             continue
-            
-    return "OPEN", None
+        if '-' in part:
+            s, e = map(int, part.split('-'))
+        else:
+            s = e = int(part)
+        s, e = max(s, 1), min(e, 65535)
+        if s <= e:
+            flags[s:e + 1] = b"\x01" * (e - s + 1)
+    return array('H', itertools.compress(range(65536), flags))
+
+class Progress:
+    """单行进度条：重绘频率有上限，输出流不是 TTY 时完全关闭"""
+
+    def __init__(self, total, Fore, stream=None, interval=0.1):
+        self.total = total
+        self.Fore = Fore
+        self.stream = stream or sys.stdout
+        self.interval = interval
+        self.enabled = total > 0 and self.stream.isatty()
+        self._last = 0.0
+
+    def update(self, current, force=False):
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        if not force and now - self._last < self.interval:
+            return
+        self._last = now
+        Fore = self.Fore
+        percent = (current / self.total) * 100
+        length = 40
+        fill = int(percent / (100 / length))
+        bar = f"{Fore.GREEN}{'█' * fill}{Fore.RESET}{'░' * (length - fill)}"
+        self.stream.write(f"\r\033[K  {Fore.CYAN}进度: {Fore.WHITE}[{bar}] {percent:.1f}% ({current}/{self.total})")
+        self.stream.flush()
+
+    def clear(self):
+        if self.enabled:
+            self.stream.write("\r\033[K")
+
+class ResultSink:
+    """
+    扫描结果输出：结果一到达就写入带缓冲的文件或标准输出，不在内存中累积
+    - text : 终端彩色表格 (写入文件时为纯文本)
+    - jsonl: 每行一个 JSON 对象
+    - csv  : 带表头的 CSV
+    """
+
+    def __init__(self, fmt="text", path=None, Fore=None):
+        self.fmt = fmt
+        self.Fore = Fore
+        self.to_file = path not in (None, "-")
+        self.count = 0
+        if self.to_file:
+            self.f = open(path, "w", encoding="utf-8", newline="", buffering=1 << 16)
+        else:
+            self.f = sys.stdout
+        self._csv = csv.writer(self.f) if fmt == "csv" else None
+        if self._csv:
+            self._csv.writerow(RESULT_FIELDS)
+
+    @property
+    def terminal(self):
+        """是否为终端彩色表格输出"""
+        return self.fmt == "text" and not self.to_file
+
+    @property
+    def log(self):
+        """提示与进度的输出流：数据写到标准输出时改走 stderr，保证管道中只有结果"""
+        return sys.stdout if self.terminal or self.to_file else sys.stderr
+
+    def write(self, res):
+        self.count += 1
+        if self.fmt == "jsonl":
+            self.f.write(json.dumps(dict(zip(RESULT_FIELDS, res)), ensure_ascii=False) + "\n")
+        elif self._csv:
+            self._csv.writerow(res)
+        elif self.to_file:
+            host, port, svc, info, link = res
+            self.f.write(f"{host:<16} | {port:<8} | {svc:<12} | {info}{' -> ' + link if link else ''}\n")
+        else:
+            Fore = self.Fore
+            host, port, svc, info, link = res
+            # 下划线使用原生 ANSI 转义码 \033[4m
+            link_str = f" -> \033[4m{link}\033[0m" if link else ""
+            print(f"{Fore.WHITE}{host:<16} | {Fore.GREEN}{port:<8}{Fore.WHITE} | {svc:<12} | {Fore.YELLOW}{info}{link_str}")
+
+    def close(self):
+        if self.to_file:
+            self.f.close()
+        else:
+            self.f.flush()
+
+# 位图中整段已完成 / 整段未开始的字节
+_DONE_RUN = re.compile(rb"\xff+")
+_FRESH_RUN = re.compile(rb"\x00+")
+
+class ScanState:
+    """
+    扫描进度：已完成 (host, port) 任务的位图 + 目前发现的开放结果
+    任务下标 = 主机序号 * 端口数 + 端口序号，每个任务只占 1 bit，
+    数千台主机 x 全端口也只有几 MB，检查点中再经 zlib 压缩
+    """
+    VERSION = 1
+
+    def __init__(self, hosts, port_input, connect_only=False, path=None, interval=10.0):
+        self.hosts = hosts
+        self.port_input = port_input
+        self.ports = parse_ports(port_input)
+        self.connect_only = connect_only
+        self.path = path
+        self.interval = interval
+        self.total = len(hosts) * len(self.ports)
+        self.bitmap = bytearray((self.total + 7) // 8)
+        self.done = 0
+        self.results = []
+        self._saved_at = time.monotonic()
+
+    def mark(self, lo, hi):
+        """把 [lo, hi) 标记为已完成，返回新完成的任务数"""
+        added = 0
+        bitmap = self.bitmap
+        for i in range(lo, hi):
+            bit = 1 << (i & 7)
+            if not bitmap[i >> 3] & bit:
+                bitmap[i >> 3] |= bit
+                added += 1
+        self.done += added
+        return added
+
+    def pending(self, lo=0, hi=None):
+        """
+        产出 [lo, hi) 内尚未完成的任务下标。对齐到字节后按整段处理：
+        连续的 0xFF (全部完成) 直接跳过，连续的 0x00 (全未开始) 整段产出，只有混合字节才逐位检查
+        """
+        hi = self.total if hi is None else hi
+        bitmap = self.bitmap
+        i = lo
+        while i < hi:
+            if not i & 7:
+                # endpos 取 hi >> 3：只匹配完全落在区间内的字节
+                run = _DONE_RUN.match(bitmap, i >> 3, hi >> 3)
+                if run:
+                    i = run.end() << 3
+                    continue
+                run = _FRESH_RUN.match(bitmap, i >> 3, hi >> 3)
+                if run:
+                    yield from range(i, run.end() << 3)
+                    i = run.end() << 3
+                    continue
+            if not bitmap[i >> 3] >> (i & 7) & 1:
+                yield i
+            i += 1
+
+    def jobs(self):
+        """按主机、端口顺序产出未完成的 (host, port, index) 任务"""
+        n = len(self.ports)
+        for i in self.pending():
+            yield self.hosts[i // n], self.ports[i % n], i
+
+    def save(self):
+        """写入检查点：先写临时文件再原子替换，避免中途断电留下半个文件"""
+        if not self.path:
+            return
+        data = {
+            "version": self.VERSION,
+            "hosts": self.hosts,
+            "ports": self.port_input,
+            "connect_only": self.connect_only,
+            "total": self.total,
+            "done": self.done,
+            "results": self.results,
+            "bitmap": base64.b64encode(zlib.compress(bytes(self.bitmap), 6)).decode(),
+        }
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+        self._saved_at = time.monotonic()
+
+    def maybe_save(self):
+        if self.path and time.monotonic() - self._saved_at >= self.interval:
+            self.save()
+
+    def finish(self):
+        """扫描完成后删除检查点；未完成 (中断) 时保存最新进度"""
+        if not self.path:
+            return
+        if self.done >= self.total:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+        else:
+            self.save()
+
+    @classmethod
+    def load(cls, path, checkpoint=None):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != cls.VERSION:
+            raise ValueError(f"不支持的检查点版本: {data.get('version')}")
+        state = cls(data["hosts"], data["ports"], data["connect_only"], checkpoint or path)
+        bitmap = zlib.decompress(base64.b64decode(data["bitmap"]))
+        if len(bitmap) != len(state.bitmap):
+            raise ValueError("检查点位图与任务规模不一致")
+        state.bitmap[:] = bitmap
+        state.done = data["done"]
+        state.results = [tuple(r) for r in data["results"]]
+        return state
+
+def load_services():
+    """
+    一次性把系统 services 数据库中的 TCP 条目读入内存 (port -> 服务名)
+    读取失败返回空表，由 lookup_service 退回 getservbyport 并逐个缓存
+    """
+    root = os.environ.get("SystemRoot", r"C:\Windows")
+    path = os.path.join(root, "System32", "drivers", "etc", "services") if os.name == 'nt' else "/etc/services"
+    table = {}
+    try:
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            for line in f:
+                fields = line.split('#', 1)[0].split()
+                if len(fields) < 2 or not fields[1].endswith("/tcp"):
+                    continue
+                port = fields[1][:-4]
+                if port.isdigit():
+                    table.setdefault(int(port), fields[0].upper())
+    except OSError:
+        pass
+    return table
+
+def lookup_service(port):
+    """查询端口的已知服务名：首次调用时载入整张表，之后只做字典查询"""
+    global _SERVICES, _SERVICES_COMPLETE
+    if _SERVICES is None:
+        _SERVICES = load_services()
+        _SERVICES_COMPLETE = bool(_SERVICES)
+    name = _SERVICES.get(port)
+    if name is None:
+        name = "CUSTOM"
+        if not _SERVICES_COMPLETE:
+            try:
+                name = socket.getservbyport(port, 'tcp').upper()
+            except OSError:
+                pass
+        _SERVICES[port] = name
+    return name
+
+def compile_fingerprints():
+    """
+    把全部指纹合并为一个带命名分组的正则：产品分组 f{i}，版本分组 v{i}。
+    一次 search 即可命中，再由 lastgroup 反查是哪一条指纹
+    """
+    global _FINGERPRINT_RE
+    parts = []
+    for i, (service, product, pattern) in enumerate(FINGERPRINTS):
+        has_version = b"(?P<v>" in pattern
+        pattern = pattern.replace(b"(?P<v>", f"(?P<v{i}>".encode())
+        parts.append(f"(?P<f{i}>".encode() + pattern + b")")
+        _FINGERPRINT_INDEX[f"f{i}"] = (service, product, f"v{i}" if has_version else None)
+    _FINGERPRINT_RE = re.compile(b"|".join(parts), re.S)
+
+def identify(data):
+    """对一段 Banner / 响应做一次指纹匹配，返回 (服务类型, "产品 版本") 或 None"""
+    if _FINGERPRINT_RE is None:
+        compile_fingerprints()
+    m = _FINGERPRINT_RE.search(data)
+    if not m:
+        return None
+    service, product, version_group = _FINGERPRINT_INDEX[m.lastgroup]
+    version = m.group(version_group) if version_group else None
+    if version:
+        product = f"{product} {version.decode('latin-1')}"
+    return service, product
+
+def describe_banner(data):
+    """Banner 能识别出产品时显示产品与版本，否则显示原文前 30 个字符"""
+    fp = identify(data)
+    if fp:
+        return fp
+    return None, data.decode('utf-8', errors='ignore').strip()[:30] or "OPEN"
+
+def tls_context():
+    """扫描只关心握手与响应内容，不校验证书；上下文创建开销较大，全局复用"""
+    global _TLS_CONTEXT
+    if _TLS_CONTEXT is None:
+        _TLS_CONTEXT = ssl.create_default_context()
+        _TLS_CONTEXT.check_hostname = False
+        _TLS_CONTEXT.verify_mode = ssl.CERT_NONE
+    return _TLS_CONTEXT
+
+async def start_tls(writer, target, timeout):
+    """在已建立的 TCP 连接上原地升级为 TLS"""
+    try:
+        ipaddress.ip_address(target)
+        server_hostname = None
+    except ValueError:
+        server_hostname = target
+    if hasattr(writer, 'start_tls'):
+        # Python 3.11+：StreamWriter.start_tls 内部即 loop.start_tls
+        await asyncio.wait_for(writer.start_tls(tls_context(), server_hostname=server_hostname), timeout)
+    else:
+        loop = asyncio.get_running_loop()
+        transport = await asyncio.wait_for(loop.start_tls(
+            writer.transport, writer.transport.get_protocol(), tls_context(),
+            server_hostname=server_hostname), timeout)
+        writer._transport = transport
+
+async def read_response(reader, timeout, limit=4096):
+    """读取响应直到对端关闭、拿到 </title>、达到上限或超时，返回已读到的数据"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    data = b""
+    while len(data) < limit and b"</title>" not in data.lower():
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        try:
+            chunk = await asyncio.wait_for(reader.read(limit - len(data)), remaining)
+        except asyncio.TimeoutError:
+            break
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+def parse_http(data):
+    """解析 HTTP 响应头，返回 (状态码, Server, 标题)"""
+    head, _, body = data.partition(b"\r\n\r\n")
+    lines = head.split(b"\r\n")
+    parts = lines[0].split()
+    code = parts[1].decode('latin-1') if len(parts) > 1 else "?"
+    server = "Unk"
+    for line in lines[1:]:
+        key, _, value = line.partition(b":")
+        if key.strip().lower() == b"server":
+            server = value.strip().decode('latin-1')[:10]
+            break
+    m = _TITLE_RE.search(body)
+    title = " ".join(m.group(1).decode('utf-8', errors='ignore').split())[:20] if m else "N/A"
+    return code, server, title
+
+async def probe_http(reader, writer, target, port, scheme, timeout):
+    """
+    在给定连接上按 scheme 完成一次 HTTP 交互
+    返回 (service_or_None, info_str, link_url_or_None)；
+    协议不匹配 (连接已被对端作废) 时返回 _WRONG_PROTOCOL
+    """
+    try:
+        if scheme == "https":
+            await start_tls(writer, target, timeout)
+        writer.write(
+            f"GET / HTTP/1.1\r\nHost: {target}\r\nUser-Agent: CLI-Kit/1.0\r\n"
+            f"Accept: */*\r\nConnection: close\r\n\r\n".encode()
+        )
+        await writer.drain()
+        data = await read_response(reader, timeout)
+    except (ssl.SSLError, ConnectionError, asyncio.TimeoutError):
+        return _WRONG_PROTOCOL
+    except OSError:
+        return None, "OPEN", None
+
+    if not data:
+        # 明文请求后对端直接断开，多半是 TLS 服务；超时无响应则只能确认端口开放
+        return _WRONG_PROTOCOL if scheme == "http" and reader.at_eof() else (None, "OPEN", None)
+    if scheme == "http" and _TLS_HINT_RE.search(data[:512]):
+        return _WRONG_PROTOCOL
+    if not data.startswith(b"HTTP/"):
+        # 非 HTTP 服务对请求的回应同样可以作为 Banner
+        return describe_banner(data) + (None,)
+
+    code, server, title = parse_http(data)
+    fp = identify(data)
+    if fp and fp[0] == "HTTP":
+        server = fp[1]
+    default_port = 443 if scheme == "https" else 80
+    url = f"{scheme}://{target}" if port == default_port else f"{scheme}://{target}:{port}"
+    return scheme.upper(), f"{code} | {server} | {title}", url
+
+async def close_writer(writer, timeout=0.5):
+    """关闭连接；TLS 连接的 close_notify 可能迟迟等不到，超时后直接中止"""
+    writer.close()
+    try:
+        await asyncio.wait_for(writer.wait_closed(), timeout)
+    except (OSError, asyncio.TimeoutError, ssl.SSLError):
+        writer.transport.abort()
+
+async def probe_service(reader, writer, target, port, timeout=1.2, banner_timeout=0.5):
+    """
+    复用已建立的连接识别服务，全程不离开事件循环:
+    1. 先等待服务端主动发送 Banner (SSH/FTP/SMTP 等)
+    2. 静默端口直接在同一连接上发送 HTTP 请求，常见 TLS 端口先用 start_tls 原地升级
+    3. 仅当首次猜测的协议不对 (连接已被对端作废) 时才重连一次，尝试另一种协议
+    每份响应只做一次指纹匹配。
+    返回: (service_or_None, info_str, link_url_or_None)，service 为指纹识别出的服务类型
+    """
+    try:
+        banner = await asyncio.wait_for(reader.read(256), timeout=banner_timeout)
+    except asyncio.TimeoutError:
+        banner = None
+    if banner:
+        return describe_banner(banner) + (None,)
+    if banner is not None:
+        # 对端连接后立即关闭，没有可探测的内容
+        return None, "OPEN", None
+
+    schemes = ("https", "http") if port in TLS_PORTS else ("http", "https")
+    result = await probe_http(reader, writer, target, port, schemes[0], timeout)
+    if result is not _WRONG_PROTOCOL:
+        return result
+
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(target, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return None, "OPEN", None
+    try:
+        result = await probe_http(reader, writer, target, port, schemes[1], timeout)
+    finally:
+        await close_writer(writer)
+    return (None, "OPEN", None) if result is _WRONG_PROTOCOL else result
+
+def raise_fd_limit():
+    """
+    把文件描述符软限制提升到硬限制 (最多 65536)。会改变整个进程的限制，
+    由扫描入口显式调用一次；控制器只读取当前限制，导入或构造控制器不会改动进程状态
+    """
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    want = 65536 if hard == resource.RLIM_INFINITY else min(hard, 65536)
+    if soft < want:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (want, hard))
+        except (ValueError, OSError):
+            pass
+
+def _fd_budget():
+    """按当前软限制估算可用于在途连接的文件描述符数量"""
+    try:
+        import resource
+    except ImportError:
+        # Windows 下 selectors 回退到 select()，句柄集合上限为 512
+        return 500
+    soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    return max(64, soft - 64)
+
+class AdaptiveController:
+    """
+    自适应扫描参数控制器
+    - 超时: 按主机用 RFC 6298 的方式平滑连接 RTT (srtt/rttvar)，据此推导连接与读取超时
+    - 并发: AIMD，一个窗口内没有异常就线性放大在途上限，超时堆积或 EMFILE 时减半；
+      减半时仍在途的连接完成之前不再判断丢包
+      RTT 高出该主机最小 RTT 的部分超过 4*rttvar 的抖动范围说明排队 (链路或本机事件循环已饱和)，
+      此时暂停放大，严重排队按丢包计入
+    - 丢包: 防火墙静默丢弃 SYN 时超时会源源不断，这不是拥塞。
+      只有该主机近期仍在应答 (任务按端口顺序执行，近期即相邻端口) 或其 RTT 正在上升时，超时才按丢包计入
+    """
+
+    ANSWER_ALPHA = 1 / 16   # 每主机近期应答率的 EWMA 系数，约等于只看最近十几次探测
+
+    def __init__(self, concurrency=500, min_concurrency=32, max_concurrency=4096,
+                 initial_timeout=1.5, min_timeout=0.25, max_timeout=3.0, increase=16):
+        self.max_limit = max(min_concurrency, min(max_concurrency, _fd_budget()))
+        self.min_limit = min_concurrency
+        self.limit = self.peak = max(min_concurrency, min(concurrency, self.max_limit))
+        self.initial_timeout = initial_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.increase = increase
+        self.inflight = 0
+        self.timeouts = 0
+        self.fd_errors = 0
+        self.processes = None
+        self._rtt = {}
+        self._answer = {}
+        self._window_done = 0
+        self._window_loss = 0
+        self._window_queued = False
+        self._hold = 0
+        self._waiters = deque()
+
+    # ---- 超时 ----
+    def connect_timeout(self, host):
+        est = self._rtt.get(host)
+        if est is None:
+            return self.initial_timeout
+        srtt, rttvar, _ = est
+        return min(self.max_timeout, max(self.min_timeout, 2 * srtt + 4 * rttvar))
+
+    def read_timeout(self, host):
+        """Banner / HTTP 响应还包含对端应用的处理时间，在连接超时之上留出余量"""
+        return min(self.max_timeout, self.connect_timeout(host) + 0.25)
+
+    # ---- 反馈 ----
+    def on_connect(self, host, rtt):
+        """一次完整往返 (SYN-ACK 或 RST)"""
+        self._answered(host, 1.0)
+        est = self._rtt.get(host)
+        if est is None:
+            self._rtt[host] = (rtt, rtt / 2, rtt)
+            self._settle()
+            return
+        srtt, rttvar, base = est
+        srtt, rttvar = 0.875 * srtt + 0.125 * rtt, 0.75 * rttvar + 0.25 * abs(srtt - rtt)
+        base = min(base, rtt)
+        self._rtt[host] = est = (srtt, rttvar, base)
+        queueing = self._queueing(est)
+        if queueing > 1:
+            self._window_loss += 1
+        elif queueing:
+            self._window_queued = True
+        self._settle()
+
+    def on_timeout(self, host):
+        self.timeouts += 1
+        # 尚无 RTT 样本的主机多半整机被过滤或离线；近期一直不应答的主机 (端口段被静默丢弃) 同理，
+        # 只有原本在应答的主机突然超时，或 RTT 已在上升时才像是拥塞造成的丢包
+        if self._answered(host, 0.0) > 0.5 or self._rtt_rising(host):
+            self._window_loss += 1
+        self._settle()
 
-async def scan_worker(target, port, sem):
-    """原子扫描任务"""
-    async with sem:
+    def _answered(self, host, sample):
+        """更新主机近期应答率，返回更新前的值 (首次见到的主机按本次结果初始化)"""
+        rate = self._answer.get(host, sample)
+        self._answer[host] = rate + self.ANSWER_ALPHA * (sample - rate)
+        return rate
+
+    def _rtt_rising(self, host):
+        est = self._rtt.get(host)
+        return est is not None and self._queueing(est) > 0
+
+    @staticmethod
+    def _queueing(est):
+        """
+        排队程度：srtt 高出最小 RTT 的部分扣除 4*rttvar (RFC 6298 的抖动范围) 后仍明显为正才算排队，
+        本机等低 RTT 目标的调度抖动会同时推高 rttvar，不会被误判。
+        返回 2 (严重排队，按丢包计入)、1 (排队，暂停放大) 或 0
+        """
+        srtt, rttvar, base = est
+        queue = srtt - base - 4 * rttvar
+        if queue > max(3 * base, 0.02):
+            return 2
+        return 1 if queue > max(base, 0.005) else 0
+
+    def on_fd_exhausted(self, inflight):
+        """EMFILE/ENFILE: 以当前在途数为新的天花板，并立即减半"""
+        self.fd_errors += 1
+        self.max_limit = max(self.min_limit, min(self.max_limit, inflight))
+        self._decrease(inflight)
+
+    def _settle(self):
+        if self._hold:
+            # 减半前已发出的连接仍带着旧的排队时延，它们的反馈不再触发第二次减半 (同 TCP 每个 RTT 只减一次)
+            self._hold -= 1
+            self._reset_window()
+            return
+        self._window_done += 1
+        if self._window_loss > max(2, self.limit // 20):
+            self._decrease(self.limit)
+        elif self._window_done >= self.limit:
+            if not self._window_loss and not self._window_queued and self.limit < self.max_limit:
+                self.limit = min(self.max_limit, self.limit + self.increase)
+                self.peak = max(self.peak, self.limit)
+                self._wake()
+            self._reset_window()
+
+    def _decrease(self, base):
+        self.limit = max(self.min_limit, base // 2)
+        self._hold = self.inflight
+        self._reset_window()
+
+    def _reset_window(self):
+        self._window_done = self._window_loss = 0
+        self._window_queued = False
+
+    # ---- 在途并发闸门 ----
+    async def acquire(self):
+        while self.inflight >= self.limit:
+            fut = asyncio.get_running_loop().create_future()
+            self._waiters.append(fut)
+            await fut
+        self.inflight += 1
+
+    def release(self):
+        self.inflight -= 1
+        self._wake()
+
+    def _wake(self):
+        free = self.limit - self.inflight
+        while free > 0 and self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                free -= 1
+
+    # ---- 汇总 ----
+    def snapshot(self):
+        return {"limit": self.limit, "peak": self.peak, "timeouts": self.timeouts,
+                "fd_errors": self.fd_errors, "rtt": dict(self._rtt)}
+
+    def absorb(self, snapshots):
+        """
+        合并各子进程控制器的最终状态。各进程的在途上限互相独立、也未必同时达到，
+        求和并不代表实际出现过的在途数，因此保留每个进程的值，汇总时按进程报告
+        """
+        snapshots = list(snapshots)
+        if not snapshots:
+            return
+        self.processes = [(s["limit"], s["peak"]) for s in snapshots]
+        self.limit = max(s["limit"] for s in snapshots)
+        self.peak = max(s["peak"] for s in snapshots)
+        self.timeouts = sum(s["timeouts"] for s in snapshots)
+        self.fd_errors = sum(s["fd_errors"] for s in snapshots)
+        for snap in snapshots:
+            self._rtt.update(snap["rtt"])
+
+    def summary(self):
+        if self.processes and len(self.processes) > 1:
+            limits = sorted(limit for limit, _ in self.processes)
+            spread = f"{limits[0]}" if limits[0] == limits[-1] else f"{limits[0]}-{limits[-1]}"
+            parts = [f"每进程在途并发 {spread} (单进程峰值 {self.peak}，{len(self.processes)} 进程)"]
+        else:
+            parts = [f"在途并发 {self.limit} (峰值 {self.peak})"]
+        parts.append(f"超时 {self.timeouts} 次")
+        if self.fd_errors:
+            parts.append(f"EMFILE {self.fd_errors} 次")
+        if self._rtt:
+            hosts = sorted(self._rtt, key=lambda h: self._rtt[h][0])
+            mid = hosts[len(hosts) // 2]
+            parts.append(f"RTT 中位 {self._rtt[mid][0] * 1000:.1f}ms / 连接超时 {self.connect_timeout(mid) * 1000:.0f}ms"
+                         f" ({len(hosts)} 主机)")
+        else:
+            parts.append(f"无 RTT 样本，连接超时 {self.initial_timeout * 1000:.0f}ms")
+        return " | ".join(parts)
+
+async def scan_worker(target, port, ctl):
+    """原子扫描任务 (并发由 scan_engine 控制，超时由 ctl 按主机 RTT 给出)"""
+    loop = asyncio.get_running_loop()
+    for attempt in itertools.count(1):
+        # 1. 尝试 TCP 三次握手
+        started = loop.time()
         try:
-            # 1. 尝试 TCP 三次握手
             conn = asyncio.open_connection(target, port)
-            reader, writer = await asyncio.wait_for(conn, timeout=1.2)
-            
-            # 2. 获取已知服务名
-            try:
-                service_name = socket.getservbyport(port, 'tcp').upper()
-            except:
-                service_name = "CUSTOM"
-            
-            # 3. 任何端口都尝试进行 Web 识别 (逻辑核心)
-            # 先读一小段数据判断是否主动吐出 Banner（如 SSH/FTP）
-            try:
-                banner = await asyncio.wait_for(reader.read(256), timeout=0.5)
-                if banner:
-                    info, link = banner.decode('utf-8', errors='ignore').strip()[:30], None
-                else:
-                    info, link = await probe_web_service(target, port)
-            except asyncio.TimeoutError:
-                # 超时未吐数据，通常是 Web 服务在等待请求，执行主动探测
-                info, link = await probe_web_service(target, port)
-            
-            writer.close()
-            await writer.wait_closed()
-            return port, service_name, info, link
-        except:
+            reader, writer = await asyncio.wait_for(conn, timeout=ctl.connect_timeout(target))
+            ctl.on_connect(target, loop.time() - started)
+            break
+        except asyncio.TimeoutError:
+            ctl.on_timeout(target)
+            return None
+        except OSError as e:
+            if e.errno in _FD_EXHAUSTED:
+                # 描述符耗尽并不代表端口关闭：收缩并发后重试，多次仍失败则按错误报告该端口
+                ctl.on_fd_exhausted(ctl.inflight)
+                if attempt >= FD_RETRIES:
+                    return target, port, lookup_service(port), f"ERROR ({e.strerror})", None
+                await asyncio.sleep(0.05)
+                continue
+            if e.errno in _CONNECT_REFUSED:
+                ctl.on_connect(target, loop.time() - started)
             return None
 
-async def main_loop(target, ports, Fore):
-    sem = asyncio.Semaphore(500)
-    total = len(ports)
-    tasks = [scan_worker(target, p, sem) for p in ports]
-    
-    print(f"\n{Fore.CYAN}⚙️  任务启动: {Fore.WHITE}{target}")
-    print(f"{Fore.WHITE}{'PORT':<8} | {'SERVICE':<12} | {'INFO / QUICK LINK'}")
-    print("-" * 80)
+    # 2. 在同一连接上识别 Banner / Web 服务
+    try:
+        read_timeout = ctl.read_timeout(target)
+        service, info, link = await probe_service(reader, writer, target, port, read_timeout, read_timeout)
+    except Exception:
+        service, info, link = None, "OPEN", None
+    finally:
+        await close_writer(writer)
+
+    # 3. 指纹未识别出服务类型时，退回端口对应的已知服务名
+    return target, port, service or lookup_service(port), info, link
+
+async def scan_engine(jobs, worker, ctl):
+    """
+    有界生产者扫描引擎
+    worker 协程从同一个迭代器中按需拉取任务，结果经有界队列流式产出。
+    协程按需启动：每拉到一个任务且协程数未达 ctl.limit 时再补一个，迭代器耗尽后不再新增，
+    任务很少的分片不会白白创建上千个协程；实际在途任务数由 ctl 的 AIMD 闸门动态控制，
+    内存占用与扫描范围大小无关。
+    每个任务都会产出一个 (job, res)，未开放时 res 为 None，便于调用方统计进度
+    """
+    jobs = iter(jobs)
+    queue = asyncio.Queue(maxsize=ctl.max_limit)
+    done = object()
+    tasks = []
+    active = 0
+    exhausted = False
+    finished = asyncio.Event()
+
+    def spawn():
+        nonlocal active
+        active += 1
+        tasks.append(asyncio.ensure_future(pull()))
+
+    async def pull():
+        # 迭代器的 next() 是同步调用，多个协程共享同一迭代器是安全的
+        nonlocal active, exhausted
+        try:
+            while not exhausted:
+                await ctl.acquire()
+                try:
+                    job = next(jobs, done)
+                    if job is done:
+                        exhausted = True
+                        return
+                    if active < ctl.limit:
+                        spawn()
+                    try:
+                        res = await worker(job)
+                    except Exception as e:
+                        res = e
+                finally:
+                    ctl.release()
+                await queue.put((job, res))
+        finally:
+            active -= 1
+            if not active:
+                finished.set()
+
+    async def run_all():
+        spawn()
+        # 只有存活的协程会补新协程，active 归零后不会再有新任务
+        await finished.wait()
+        await asyncio.gather(*tasks)
+        await queue.put(done)
+
+    runner = asyncio.ensure_future(run_all())
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            if isinstance(item[1], Exception):
+                raise item[1]
+            yield item
+        await runner
+    finally:
+        for task in [runner, *tasks]:
+            if not task.done():
+                task.cancel()
+
+def sweep_connect(jobs, ctl):
+    """
+    仅连接探测的快速路径：非阻塞 connect_ex + selectors (epoll/kqueue/select)
+    不创建 StreamReader/StreamWriter，关闭端口只消耗一次 RST。
+    在途连接数与超时同样由 ctl 控制。
+    jobs 为 (host, port, ...) 迭代器，逐个产出 (job, is_open)；
+    另外每轮 select 之后产出一次 (None, None)，且单次 select 最多等待 SWEEP_TICK 秒，
+    供异步调用方定期让出事件循环
+    """
+    sel = selectors.DefaultSelector()
+    # 各主机超时不同，按截止时间建小顶堆；已完成的连接惰性出堆
+    deadlines = []
+    inflight = 0
+    resolved = {}
+    jobs = iter(jobs)
+    retry = None
+    exhausted = False
+    seq = itertools.count()
+
+    try:
+        while True:
+            # 1. 补满在途连接
+            while not exhausted and inflight < ctl.limit:
+                job, retry = retry or next(jobs, None), None
+                if job is None:
+                    exhausted = True
+                    break
+                host, port = job[:2]
+                if host not in resolved:
+                    try:
+                        resolved[host] = socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)[0]
+                    except OSError:
+                        resolved[host] = None
+                addr = resolved[host]
+                if addr is None:
+                    yield job, False
+                    continue
+                family, _, _, _, sockaddr = addr
+                try:
+                    sock = socket.socket(family, socket.SOCK_STREAM)
+                except OSError as e:
+                    if e.errno not in _FD_EXHAUSTED or not inflight:
+                        raise
+                    # 描述符耗尽：收缩并发，等已有连接完成后重试该任务
+                    ctl.on_fd_exhausted(inflight)
+                    retry = job
+                    break
+                sock.setblocking(False)
+                started = time.monotonic()
+                err = sock.connect_ex((sockaddr[0], port) + tuple(sockaddr[2:]))
+                if err in _CONNECT_PENDING:
+                    sel.register(sock, selectors.EVENT_WRITE, (job, started))
+                    heapq.heappush(deadlines, (started + ctl.connect_timeout(host), next(seq), sock, job))
+                    inflight += 1
+                else:
+                    sock.close()
+                    if err == 0 or err in _CONNECT_REFUSED:
+                        ctl.on_connect(host, time.monotonic() - started)
+                    yield job, err == 0
+
+            if not inflight:
+                if retry is None:
+                    break
+                continue
+
+            # 2. 等待可写事件，最长等到最早一个连接超时
+            wait = min(SWEEP_TICK, max(0.0, deadlines[0][0] - time.monotonic()))
+            for key, _ in sel.select(wait):
+                sock = key.fileobj
+                job, started = key.data
+                err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                sel.unregister(sock)
+                sock.close()
+                inflight -= 1
+                if err == 0 or err in _CONNECT_REFUSED:
+                    ctl.on_connect(job[0], time.monotonic() - started)
+                yield job, err == 0
+
+            # 3. 清理已完成的堆顶，并判定超时连接
+            now = time.monotonic()
+            while deadlines and (deadlines[0][2].fileno() == -1 or deadlines[0][0] <= now):
+                _, _, sock, job = heapq.heappop(deadlines)
+                if sock.fileno() != -1:
+                    sel.unregister(sock)
+                    sock.close()
+                    inflight -= 1
+                    ctl.on_timeout(job[0])
+                    yield job, False
+            yield None, None
+    finally:
+        for _, _, sock, _ in deadlines:
+            if sock.fileno() != -1:
+                sel.unregister(sock)
+                sock.close()
+        sel.close()
+
+async def scan_stream(jobs, ctl, connect_only=False):
+    """
+    单事件循环内的扫描流：jobs 为 (host, port, ...) 迭代器，
+    每完成一个任务产出一次 (job, res)，未开放时 res 为 None
+    """
+    if connect_only:
+        # 同步的 selectors 循环在事件循环内运行；每轮 select 后让出一次，
+        # 否则 3.11+ 中 Ctrl-C 触发的主任务取消要等整个扫描结束才会生效
+        sweep = sweep_connect(jobs, ctl)
+        try:
+            for job, is_open in sweep:
+                if job is None:
+                    await asyncio.sleep(0)
+                    continue
+                yield job, (job[0], job[1], lookup_service(job[1]), "OPEN", None) if is_open else None
+        finally:
+            sweep.close()
+    else:
+        async for item in scan_engine(jobs, lambda job: scan_worker(job[0], job[1], ctl), ctl):
+            yield item
+
+# ---- 多进程分片 ----
+_SHARD_CTX = {}
+
+def _init_shard_worker(hosts, ports, connect_only, concurrency):
+    """
+    进程池初始化：主机与端口表只随每个子进程传递一次，分片本身只携带下标。
+    自适应控制器按进程常驻，跨分片保留已学到的 RTT 与并发上限
+    """
+    _SHARD_CTX.update(hosts=hosts, ports=ports, connect_only=connect_only, ctl=AdaptiveController(concurrency))
+
+async def _collect_shard(jobs):
+    return [(job[2], res) async for job, res in scan_stream(jobs, _SHARD_CTX["ctl"], _SHARD_CTX["connect_only"]) if res]
+
+def scan_shard(shard):
+    """
+    进程池入口：在子进程独立的事件循环中扫描一个分片
+    返回 (按下标即主机、端口顺序排序的开放结果, (pid, 控制器状态))
+    """
+    lo, hi, pending = shard
+    hosts, ports = _SHARD_CTX["hosts"], _SHARD_CTX["ports"]
+    n = len(ports)
+    indices = range(lo, hi) if pending is None else (lo + i for i in pending)
+    jobs = ((hosts[i // n], ports[i % n], i) for i in indices)
+    results = [res for _, res in sorted(asyncio.run(_collect_shard(jobs)), key=lambda r: r[0])]
+    return results, (os.getpid(), _SHARD_CTX["ctl"].snapshot())
+
+def make_shards(state, shard_size=SHARD_SIZE):
+    """
+    把位图下标 [0, total) 按 shard_size 切成连续区间，产出未完成的 (lo, hi, pending)。
+    一个分片可跨越多个主机：少量端口 x 大量主机 (如 /22 的常用服务扫描) 时，
+    每个子进程的事件循环里仍有足够多的任务可以并发。
+    先按字节切片整体判断：全未开始的分片 pending 为 None，全部完成的直接跳过，
+    只有部分完成 (续扫) 的分片才逐个列出剩余任务相对 lo 的偏移
+    """
+    bitmap = state.bitmap
+    for lo in range(0, state.total, shard_size):
+        hi = min(lo + shard_size, state.total)
+        seg = bitmap[lo >> 3:(hi + 7) >> 3]
+        if seg.count(0) == len(seg):
+            yield lo, hi, None
+        elif seg.count(0xFF) != len(seg):
+            # 末尾分片的最后一个字节含有 total 之外的空位，整段完成时也会走到这里，由 left 为空兜底
+            left = array('H', (i - lo for i in state.pending(lo, hi)))
+            if left:
+                yield lo, hi, left
+
+def _register_module():
+    """
+    宿主一般按文件路径动态加载插件，模块未必登记在 sys.modules / sys.path 中，
+    而进程池需要按模块名序列化 scan_shard 并在子进程里重新导入本文件
+    """
+    if sys.modules.get(__name__) is None:
+        module = types.ModuleType(__name__)
+        module.__dict__.update(globals())
+        sys.modules[__name__] = module
+    plugin_dir = os.path.dirname(os.path.abspath(__file__))
+    if plugin_dir not in sys.path:
+        sys.path.append(plugin_dir)
+
+async def sharded_stream(state, connect_only=False, concurrency=500, workers=None, ctl=None):
+    """
+    多进程扫描流：分片提交到进程池，每个分片在子进程内拥有独立事件循环。
+    提交窗口有界，结果按分片顺序 (即位图下标顺序：主机顺序、端口升序) 合并为一条有序流。
+    先逐个产出 (None, res)，分片结束时再产出 ((lo, hi), None) 表示该下标区间已完成。
+    传入 ctl 时，结束后汇总各子进程控制器的最终参数
+    """
+    workers = workers or os.cpu_count() or 1
+    _register_module()
+    loop = asyncio.get_running_loop()
+    pool = ProcessPoolExecutor(workers, initializer=_init_shard_worker,
+                               initargs=(state.hosts, state.ports, connect_only, concurrency))
+    pending = deque()
+    states = {}
+
+    async def drain():
+        shard, fut = pending.popleft()
+        results, (pid, states[pid]) = await fut
+        return shard, results
 
-    current = 0
-    found_any = False
+    try:
+        for shard in make_shards(state):
+            pending.append((shard, loop.run_in_executor(pool, scan_shard, shard)))
+            while len(pending) > workers * 2 or (pending and pending[0][1].done()):
+                (lo, hi, _), results = await drain()
+                for res in results:
+                    yield None, res
+                yield (lo, hi), None
+        while pending:
+            (lo, hi, _), results = await drain()
+            for res in results:
+                yield None, res
+            yield (lo, hi), None
+        # 正常结束时等待子进程退出；wait=False 可能让空闲子进程收不到退出信号
+        pool.shutdown(wait=True)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        if ctl is not None:
+            ctl.absorb(states.values())
+
+async def main_loop(state, Fore, concurrency=500, workers=1, sink=None):
+    hosts = state.hosts
+    ctl = AdaptiveController(concurrency)
+    sink = sink or ResultSink("text", None, Fore)
+    log = sink.log
+    progress = Progress(state.total, Fore, log)
+
+    async def results():
+        # 统一产出 ((lo, hi) 或 None, res)：区间表示这些任务已完成
+        if workers > 1:
+            async for item in sharded_stream(state, state.connect_only, concurrency, workers, ctl):
+                yield item
+        else:
+            async for job, res in scan_stream(state.jobs(), ctl, state.connect_only):
+                yield (job[2], job[2] + 1), res
     
-    for task in asyncio.as_completed(tasks):
-        res = await task
-        current += 1
-        
-        if res:
-            found_any = True
-            port, svc, info, link = res
-            sys.stdout.write("\r\033[K") # 清除进度条
-            
-            # 下划线使用原生 ANSI 转义码 \033[4m
-            link_str = f" -> \033[4m{link}\033[0m" if link else ""
-            print(f"{Fore.GREEN}{port:<8}{Fore.WHITE} | {svc:<12} | {Fore.YELLOW}{info}{link_str}")
-        
-        render_progress(current, total, Fore)
+    target_desc = hosts[0] if len(hosts) == 1 else f"{hosts[0]} 等 {len(hosts)} 个主机"
+    mode_desc = f" ({workers} 进程)" if workers > 1 else ""
+    print(f"\n{Fore.CYAN}⚙️  任务启动: {Fore.WHITE}{target_desc}{mode_desc}", file=log)
+    if state.done:
+        print(f"{Fore.CYAN}⏯️  从检查点续扫: {Fore.WHITE}已完成 {state.done}/{state.total}，"
+              f"已发现 {len(state.results)} 个开放端口", file=log)
+    if sink.terminal:
+        print(f"{Fore.WHITE}{'HOST':<16} | {'PORT':<8} | {'SERVICE':<12} | {'INFO / QUICK LINK'}")
+    print("-" * 80, file=log)
+
+    # 续扫时先重放检查点中的结果，保证输出完整
+    for res in state.results:
+        sink.write(res)
 
-    sys.stdout.write("\r\033[K")
-    if not found_any:
-        print(f"{Fore.YELLOW}  未发现任何开放端口。")
-    print("-" * 80)
+    try:
+        async for span, res in results():
+            if res:
+                progress.clear() # 清除进度条
+                sink.write(res)
+                state.results.append(res)
+
+            if span:
+                # 结果先于完成标记写入状态，检查点里不会出现 "已完成但结果丢失" 的任务
+                state.mark(*span)
+                progress.update(state.done)
+                state.maybe_save()
+    finally:
+        progress.clear()
+        state.finish()
+
+    if not sink.count:
+        print(f"{Fore.YELLOW}  未发现任何开放端口。", file=log)
+    elif not sink.terminal:
+        print(f"{Fore.GREEN}  发现 {sink.count} 个开放端口。", file=log)
+    print("-" * 80, file=log)
+    print(f"{Fore.CYAN}📐 自适应参数: {Fore.WHITE}{ctl.summary()}", file=log)
 
 def run_portscan(args, tools):
-    import questionary
     Fore = tools.get("Fore")
+
+    # 命令行给全参数时 (cron / 脚本) 不需要交互，未安装 questionary 也能运行
+    try:
+        import questionary
+    except ImportError:
+        questionary = None
+
+    resume = getattr(args, 'resume', None)
+    checkpoint = getattr(args, 'checkpoint', None)
+    if resume:
+        try:
+            state = ScanState.load(resume, checkpoint)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"{Fore.RED}❌ 检查点读取失败: {e}", file=sys.stderr)
+            return
+        run_scan(args, Fore, state)
+        return
     
-    target = getattr(args, 'target', None) or questionary.text("目标地址:", default="127.0.0.1").ask()
-    if not target: return
-
-    choices = [
-        questionary.Choice(
-            title=[("class:text", f"{name:<18} "), ("class:instruction", f"({data['desc']})")],
-            value=data['ports']
-        ) for name, data in PORT_PRESETS.items()
-    ]
-    choices.append(questionary.Choice("自定义范围", value="custom"))
-
-    port_input = questionary.select("选择扫描方案:", choices=choices).ask()
-    if port_input == "custom":
-        port_input = questionary.text("输入范围:").ask()
-    if not port_input: return
-
-    try:
-        ports = []
-        for part in port_input.split(','):
-            part = part.strip()
-            if '-' in part:
-                s, e = map(int, part.split('-'))
-                ports.extend(range(s, e + 1))
-            else:
-                ports.append(int(part))
-        ports = sorted(list(set([p for p in ports if 0 < p <= 65535])))
-    except:
-        print(f"{Fore.RED}❌ 端口解析错误。")
+    target = getattr(args, 'target', None)
+    if not target and questionary:
+        target = questionary.text("目标地址 (IP/域名、CIDR、范围或 @主机列表文件):", default="127.0.0.1").ask()
+    if not target:
+        print(f"{Fore.RED}⚠️ 操作取消：未提供扫描目标。", file=sys.stderr)
+        return
+
+    try:
+        hosts = parse_targets(target)
+    except (ValueError, OSError) as e:
+        print(f"{Fore.RED}❌ 目标解析错误: {e}", file=sys.stderr)
+        return
+    if not hosts: return
+
+    # 命令行给出端口即为非交互模式，不再发起任何询问
+    port_input = getattr(args, 'ports', None)
+    interactive = not port_input
+    if interactive and not questionary:
+        print(f"{Fore.RED}⚠️ 操作取消：未提供端口 (-p)。", file=sys.stderr)
+        return
+    if interactive:
+        choices = [
+            questionary.Choice(
+                title=[("class:text", f"{name:<18} "), ("class:instruction", f"({data['desc']})")],
+                value=data['ports']
+            ) for name, data in PORT_PRESETS.items()
+        ]
+        choices.append(questionary.Choice("自定义范围", value="custom"))
+
+        port_input = questionary.select("选择扫描方案:", choices=choices).ask()
+        if port_input == "custom":
+            port_input = questionary.text("输入范围:").ask()
+        if not port_input: return
+
+    connect_only = getattr(args, 'connect_only', None)
+    if connect_only is None and interactive:
+        connect_only = questionary.confirm("仅探测端口开放状态 (跳过服务识别，速度更快)?", default=False).ask()
+
+    try:
+        state = ScanState(hosts, port_input, bool(connect_only), checkpoint)
+    except ValueError:
+        print(f"{Fore.RED}❌ 端口解析错误。", file=sys.stderr)
+        return
+    run_scan(args, Fore, state)
+
+def run_scan(args, Fore, state):
+    """按命令行参数准备输出与进程数，执行扫描 (新任务与续扫共用)"""
+    # 任务量超过一个分片时才值得启动进程池
+    workers = getattr(args, 'workers', None)
+    if workers is None:
+        workers = min(os.cpu_count() or 1, -(-state.total // SHARD_SIZE))
+
+    try:
+        sink = ResultSink(getattr(args, 'format', None) or "text", getattr(args, 'output', None), Fore)
+    except OSError as e:
+        print(f"{Fore.RED}❌ 无法写入输出文件: {e}", file=sys.stderr)
         return
+    log = sink.log
 
+    # 子进程继承提升后的限制，分片扫描只需在这里提升一次
+    raise_fd_limit()
     start_time = time.time()
     try:
-        asyncio.run(main_loop(target, ports, Fore))
+        asyncio.run(main_loop(state, Fore, concurrency=getattr(args, 'concurrency', None) or 500,
+                              workers=workers, sink=sink))
     except KeyboardInterrupt:
-        print(f"\n{Fore.YELLOW}⚠️ 用户中断。")
+        print(f"\n{Fore.YELLOW}⚠️ 用户中断。", file=log)
+        if state.path and state.done < state.total:
+            print(f"{Fore.CYAN}💾 进度已保存，使用 --resume {state.path} 继续扫描", file=log)
+    finally:
+        sink.close()
     
-    print(f"{Fore.CYAN}✨ 耗时: {time.time()-start_time:.2f}s")
\ No newline at end of file
+    print(f"{Fore.CYAN}✨ 耗时: {time.time()-start_time:.2f}s", file=log)
+    if sink.to_file:
+        print(f"{Fore.CYAN}📁 结果已保存至 {args.output}")
@@ -1,7 +1,16 @@
+import collections
+import heapq
+import json
+import queue
 import platform
 import psutil
+import shutil
+import sys
 import time
 import os
+import threading
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 __info__ = {
     "help": "系统运行信息监控",
@@ -12,6 +21,42 @@ __info__ = {
     "depends": ["psutil"]
 }
 
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+# (键, 标签, 是否为百分比) —— 百分比指标的曲线按 0-100 缩放，速率按窗口内最大值缩放
+METRICS = [
+    ("cpu", "CPU 负载", True),
+    ("mem", "内存占用", True),
+    ("net_up", "网络上传", False),
+    ("net_down", "网络下载", False),
+    ("disk_read", "磁盘读取", False),
+    ("disk_write", "磁盘写入", False),
+]
+DEFAULT_LISTEN = "127.0.0.1:9101"
+PROM_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DISK_TIMEOUT = 1.0
+DISK_WORKERS = 16
+# 不对应真实存储的伪文件系统，探测前直接过滤 (根目录 / 例外，容器里根目录常为 overlay)
+PSEUDO_FS = frozenset("""
+    autofs binfmt_misc bpf cgroup cgroup2 configfs debugfs devpts devtmpfs efivarfs fusectl
+    hugetlbfs mqueue nsfs overlay proc pstore ramfs rpc_pipefs securityfs selinuxfs squashfs
+    sysfs tmpfs tracefs
+""".split())
+PROC_SORTS = ["cpu", "rss", "io"]
+# 进程表每轮采集的字段：cpu_times / create_time / name 同出自 /proc/<pid>/stat，memory_info 来自 statm
+PROC_ATTRS = ["pid", "name", "cpu_times", "memory_info", "create_time"]
+
+def setup_args(parser):
+    """定义命令行参数模式"""
+    parser.add_argument("--watch", action="store_true", help="持续监控模式，原地刷新")
+    parser.add_argument("--interval", type=float, default=1.0, help="watch: 采样间隔 (秒)")
+    parser.add_argument("--history", type=int, default=60, help="watch: 保留的采样点数 (曲线宽度)")
+    parser.add_argument("--top", type=int, metavar="N", help="显示资源占用最高的 N 个进程")
+    parser.add_argument("--sort", choices=PROC_SORTS, default="cpu", help="进程排序依据 (cpu/rss/io)")
+    parser.add_argument("--disk-timeout", type=float, default=DISK_TIMEOUT,
+                        help="单个挂载点的探测超时 (秒)，超时的挂载点标记为无响应")
+    parser.add_argument("--serve", nargs="?", const=DEFAULT_LISTEN, metavar="[HOST:]PORT",
+                        help=f"以指标导出模式运行，提供 /metrics (Prometheus) 与 /metrics.json (默认 {DEFAULT_LISTEN})")
+
 def get_size(bytes, suffix="B"):
     """容量单位自动转换"""
     factor = 1024
@@ -20,15 +65,518 @@ def get_size(bytes, suffix="B"):
             return f"{bytes:.2f}{unit}{suffix}"
         bytes /= factor
 
+def mount_candidates():
+    """
+    列出需要探测的挂载点：过滤伪文件系统与空 fstype，同一设备 (bind mount 等) 只保留挂载路径最短的一个。
+    只读 /proc/mounts 一类的挂载表，不会触碰挂载点本身
+    """
+    picked = {}
+    parts = psutil.disk_partitions(all=True)
+    for index, partition in sorted(enumerate(parts), key=lambda item: len(item[1].mountpoint)):
+        # 排除虚拟盘和空盘
+        if os.name == 'nt':
+            if 'cdrom' in partition.opts or partition.fstype == '': continue
+        elif partition.mountpoint != "/" and (partition.fstype in PSEUDO_FS or not partition.fstype):
+            continue
+        device = partition.device
+        # 块设备、网络共享 (host:/path、//host/share) 以设备名去重，其余 (none 等) 的设备名不可区分
+        key = device if device.startswith(("/", "\\\\")) or ":" in device else (device, partition.mountpoint)
+        if key not in picked:
+            picked[key] = index
+    return [parts[i] for i in sorted(picked.values())]
+
+# 仍卡在探测中的挂载点 -> 卡住的线程数；下次采样直接判定为无响应，避免每轮再堆积一个线程
+_stuck = {}
+_stuck_lock = threading.Lock()
+
+class DiskProbe:
+    """
+    并行探测各挂载点用量：创建即开始，由最多 workers 个守护线程从队列取挂载点调用 disk_usage。
+    每个挂载点从开始探测起计时，超过 timeout 仍未返回即标记为无响应并补一个线程继续处理其余挂载点；
+    卡住的线程是守护线程，不会阻止进程退出
+    """
+    def __init__(self, timeout=DISK_TIMEOUT, workers=DISK_WORKERS):
+        self.timeout = timeout
+        self.parts = mount_candidates()
+        self.results = [None] * len(self.parts)
+        self.started = [None] * len(self.parts)
+        self.stalled = set()
+        self.finished = queue.Queue()
+        with _stuck_lock:
+            stuck = [i for i, p in enumerate(self.parts) if _stuck.get(p.mountpoint)]
+        self.stalled.update(stuck)
+        self.todo = collections.deque(i for i in range(len(self.parts)) if i not in self.stalled)
+        for _ in range(min(workers, len(self.todo))):
+            self._spawn()
+
+    def _spawn(self):
+        threading.Thread(target=self._work, daemon=True).start()
+
+    def _work(self):
+        while True:
+            try:
+                i = self.todo.popleft()
+            except IndexError:
+                return
+            mountpoint = self.parts[i].mountpoint
+            self.started[i] = time.monotonic()
+            try:
+                result = psutil.disk_usage(mountpoint)
+            except OSError as e:
+                result = e
+            with _stuck_lock:
+                self.results[i] = result
+                if i in self.stalled:
+                    # 超时后才返回：解除标记，这个线程也已被替换，直接退出
+                    _stuck[mountpoint] -= 1
+                    return
+            self.finished.put(i)
+
+    def collect(self):
+        """
+        等待全部挂载点返回或超时。
+        返回 ([(分区, 用量)], [(分区, 原因)])；无权限的挂载点与以前一样直接跳过
+        """
+        remaining = len(self.parts) - len(self.stalled)
+        while remaining:
+            now = time.monotonic()
+            wait = self.timeout
+            with _stuck_lock:
+                for i, start in enumerate(self.started):
+                    if start is None or self.results[i] is not None or i in self.stalled:
+                        continue
+                    if now - start >= self.timeout:
+                        self.stalled.add(i)
+                        mountpoint = self.parts[i].mountpoint
+                        _stuck[mountpoint] = _stuck.get(mountpoint, 0) + 1
+                        remaining -= 1
+                        if self.todo:
+                            self._spawn()
+                    else:
+                        wait = min(wait, start + self.timeout - now)
+            if not remaining:
+                break
+            try:
+                self.finished.get(timeout=max(wait, 0.005))
+                remaining -= 1
+                # 一次取完已返回的结果，减少逐个唤醒的开销
+                while True:
+                    self.finished.get_nowait()
+                    remaining -= 1
+            except queue.Empty:
+                pass
+
+        usages, problems = [], []
+        for i, partition in enumerate(self.parts):
+            result = self.results[i]
+            if i in self.stalled:
+                problems.append((partition, f"无响应 (>{self.timeout:g}s)"))
+            elif isinstance(result, PermissionError):
+                continue
+            elif isinstance(result, OSError):
+                problems.append((partition, str(result)))
+            else:
+                usages.append((partition, result))
+        return usages, problems
+
+class Ring:
+    """定长环形缓冲区，底层为 array('d')，写满后覆盖最旧的采样，不再增长"""
+    def __init__(self, size):
+        self.data = array("d", bytes(8 * size))
+        self.size = size
+        self.pos = 0
+        self.count = 0
+
+    def push(self, value):
+        self.data[self.pos] = value
+        self.pos = (self.pos + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+
+    def values(self):
+        """按时间顺序返回已有的采样"""
+        if self.count < self.size:
+            return self.data[:self.count]
+        return self.data[self.pos:] + self.data[:self.pos]
+
+    @property
+    def last(self):
+        return self.data[self.pos - 1] if self.count else 0.0
+
+class Sampler:
+    """
+    周期采样器：保存上一次的累计计数器 (网络/磁盘)，按两次采样实际经过的时间换算速率。
+    cpu_percent(None) 返回的是与上一次调用之间的占用率，构造时先调用一次作为基准
+    """
+    def __init__(self):
+        psutil.cpu_percent(None)
+        self.stamp = time.monotonic()
+        self.net = psutil.net_io_counters()
+        self.disk = psutil.disk_io_counters()
+        self.mem = None
+
+    def sample(self):
+        """采集一次，返回与 METRICS 顺序一致的数值元组"""
+        now = time.monotonic()
+        elapsed = max(now - self.stamp, 1e-6)
+        net = psutil.net_io_counters()
+        disk = psutil.disk_io_counters()
+        self.mem = psutil.virtual_memory()
+
+        def rate(new, old, field):
+            # 计数器可能因网卡/磁盘变化而回绕或清零，负值按 0 处理
+            if new is None or old is None:
+                return 0.0
+            return max(getattr(new, field) - getattr(old, field), 0) / elapsed
+
+        values = (
+            psutil.cpu_percent(None),
+            self.mem.percent,
+            rate(net, self.net, "bytes_sent"),
+            rate(net, self.net, "bytes_recv"),
+            rate(disk, self.disk, "read_bytes"),
+            rate(disk, self.disk, "write_bytes"),
+        )
+        self.stamp, self.net, self.disk = now, net, disk
+        return values
+
+class ProcessTable:
+    """
+    进程 Top-N 采样：process_iter(attrs=...) 内部对每个进程开一次 oneshot()，
+    同一批 /proc 文件只读一遍；CPU% 与 I/O 速率由两次采样的累计值之差除以经过时间得到。
+    以 (pid, create_time) 作为键，PID 被复用时不会与旧进程的累计值相减
+    """
+    def __init__(self, sort="cpu"):
+        self.sort = sort
+        # I/O 计数器需额外读 /proc/<pid>/io (且常因权限被拒)，只在按 I/O 排序时采集
+        self.attrs = PROC_ATTRS + (["io_counters"] if sort == "io" else [])
+        self.prev = {}
+        self.stamp = None
+        self.total = 0
+
+    def sample(self, n):
+        """采集一轮，返回按排序字段取前 n 个的 [(pid, name, cpu%, rss, io/s)]"""
+        now = time.monotonic()
+        elapsed = now - self.stamp if self.stamp else 0
+        current = {}
+        rows = []
+        for proc in psutil.process_iter(self.attrs, ad_value=None):
+            info = proc.info
+            times, mem = info["cpu_times"], info["memory_info"]
+            if times is None:
+                continue
+            key = (info["pid"], info["create_time"])
+            cpu = times.user + times.system
+            io = info.get("io_counters")
+            io = io.read_bytes + io.write_bytes if io else 0
+            current[key] = (cpu, io)
+            last = self.prev.get(key)
+            if last and elapsed > 0:
+                cpu_pct = (cpu - last[0]) / elapsed * 100
+                io_rate = max(io - last[1], 0) / elapsed
+            else:
+                cpu_pct = io_rate = 0.0
+            rows.append((info["pid"], info["name"] or "?", cpu_pct, mem.rss if mem else 0, io_rate))
+        self.prev, self.stamp, self.total = current, now, len(rows)
+        column = {"cpu": 2, "rss": 3, "io": 4}[self.sort]
+        return heapq.nlargest(n, rows, key=lambda r: r[column])
+
+def process_lines(Fore, table, rows):
+    """进程表格的文本行"""
+    lines = [f"{Fore.CYAN}🔥 进程 Top {len(rows)} (按 {table.sort} 排序，共 {table.total} 个进程)",
+             f"{Fore.WHITE}{'PID':>7}  {'NAME':<24} {'CPU%':>6} {'RSS':>10} {'I/O':>12}"]
+    for pid, name, cpu, rss, io in rows:
+        color = level_color(Fore, cpu, Fore.WHITE)
+        io_text = f"{get_size(io)}/s" if table.sort == "io" else "-"
+        lines.append(f"{color}{pid:>7}  {name[:24]:<24} {cpu:>6.1f} {get_size(rss):>10} {io_text:>12}")
+    return lines
+
+def sparkline(values, width, top=None):
+    """把最近 width 个采样渲染成 ▁▂▃▄▅▆▇█ 曲线，不足 width 时左侧补空格"""
+    values = values[-width:]
+    top = top or max(values, default=0) or 1
+    scale = (len(SPARK_CHARS) - 1) / top
+    line = "".join(SPARK_CHARS[min(int(v * scale + 0.5), len(SPARK_CHARS) - 1)] for v in values)
+    return line.rjust(width)
+
+def level_color(Fore, percent, default):
+    """根据负载自动变换颜色"""
+    if percent > 85:
+        return Fore.RED
+    if percent > 60:
+        return Fore.YELLOW
+    return default
+
+def render_frame(Fore, sampler, rings, interval, ticks, procs=None):
+    """拼出一整屏内容，每行以 ESC[K 清除行尾残留，最后 ESC[J 清除下方旧内容"""
+    cols = shutil.get_terminal_size((80, 24)).columns
+    width = max(10, min(rings[0].size, cols - 40))
+    mem = sampler.mem
+    lines = [
+        f"{Fore.CYAN}🖥️  DevBox SysInfo - 实时监控 ({platform.node()})",
+        f"{Fore.WHITE}{time.strftime('%H:%M:%S')} | 间隔 {interval:g}s | 采样 {ticks} | Ctrl+C 退出",
+        "-" * min(cols - 1, 65),
+    ]
+    for (key, label, is_percent), ring in zip(METRICS, rings):
+        values = ring.values()
+        cur = ring.last
+        if is_percent:
+            color = level_color(Fore, cur, Fore.GREEN)
+            line = sparkline(values, width, 100)
+            text = f"{cur:5.1f}%  (峰值 {max(values):.1f}%)"
+            if key == "mem":
+                text += f" {get_size(mem.used)} / {get_size(mem.total)}"
+        else:
+            color = Fore.BLUE
+            line = sparkline(values, width)
+            text = f"{get_size(cur)}/s  (峰值 {get_size(max(values))}/s)"
+        lines.append(f"{Fore.WHITE}{label:<8} : {color}{line} {Fore.WHITE}{text}")
+    if procs:
+        lines.append("-" * min(cols - 1, 65))
+        lines += process_lines(Fore, *procs)
+    return "\x1b[H" + "".join(line + "\x1b[K\n" for line in lines) + "\x1b[J"
+
+def run_watch(Fore, interval, history, top=None, sort="cpu"):
+    """
+    持续监控：按固定节拍采样写入环形缓冲区并原地重绘。
+    每次采样只读取几个计数器，整屏拼成一个字符串一次写出，1 秒间隔下自身开销远低于 1% CPU
+    """
+    rings = [Ring(history) for _ in METRICS]
+    sampler = Sampler()
+    table = ProcessTable(sort) if top else None
+    if table:
+        table.sample(top)
+    out = sys.stdout
+    out.write("\x1b[?25l\x1b[2J")
+    ticks = 0
+    deadline = time.monotonic()
+    try:
+        while True:
+            # 以截止时间推进而不是固定 sleep，避免绘制耗时累积造成漂移
+            deadline += interval
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                deadline = time.monotonic()
+            for ring, value in zip(rings, sampler.sample()):
+                ring.push(value)
+            ticks += 1
+            procs = (table, table.sample(top)) if table else None
+            out.write(render_frame(Fore, sampler, rings, interval, ticks, procs))
+            out.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        out.write("\x1b[?25h\n")
+        out.flush()
+
+def _label(value):
+    """Prometheus 标签值转义"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def snapshot(sampler, disk_timeout=DISK_TIMEOUT):
+    """采集一次完整快照 (与 METRICS 同源的速率 + 累计计数器 + 各分区用量)"""
+    probe = DiskProbe(disk_timeout)
+    values = dict(zip((m[0] for m in METRICS), sampler.sample()))
+    mem, net, disk = sampler.mem, sampler.net, sampler.disk
+    usages, problems = probe.collect()
+    return {
+        "timestamp": time.time(),
+        "boot_time": psutil.boot_time(),
+        "cpu_percent": values["cpu"],
+        "memory": {"total": mem.total, "used": mem.used, "available": mem.available, "percent": mem.percent},
+        "network": {
+            "sent_per_sec": values["net_up"], "recv_per_sec": values["net_down"],
+            "bytes_sent": net.bytes_sent, "bytes_recv": net.bytes_recv,
+        },
+        "disk_io": {
+            "read_per_sec": values["disk_read"], "write_per_sec": values["disk_write"],
+            "read_bytes": disk.read_bytes if disk else 0, "write_bytes": disk.write_bytes if disk else 0,
+        },
+        "partitions": [
+            {"device": p.device, "mountpoint": p.mountpoint, "fstype": p.fstype,
+             "total": u.total, "used": u.used, "free": u.free, "percent": u.percent}
+            for p, u in usages
+        ],
+        "unresponsive": [
+            {"device": p.device, "mountpoint": p.mountpoint, "fstype": p.fstype, "error": reason}
+            for p, reason in problems
+        ],
+    }
+
+def render_prometheus(snap):
+    """把快照渲染为 Prometheus 文本格式 (0.0.4)"""
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP sysinfo_{name} {help_text}")
+        lines.append(f"# TYPE sysinfo_{name} {kind}")
+        for labels, value in samples:
+            lines.append(f"sysinfo_{name}{labels} {value!r}")
+
+    def one(value):
+        return [("", value)]
+
+    mem, net, disk = snap["memory"], snap["network"], snap["disk_io"]
+    metric("sample_timestamp_seconds", "gauge", "Unix time of the cached sample.", one(snap["timestamp"]))
+    metric("boot_time_seconds", "gauge", "System boot time.", one(snap["boot_time"]))
+    metric("cpu_percent", "gauge", "CPU utilisation over the last sample interval.", one(snap["cpu_percent"]))
+    metric("memory_total_bytes", "gauge", "Total physical memory.", one(mem["total"]))
+    metric("memory_used_bytes", "gauge", "Used physical memory.", one(mem["used"]))
+    metric("memory_available_bytes", "gauge", "Available physical memory.", one(mem["available"]))
+    metric("memory_percent", "gauge", "Memory utilisation.", one(mem["percent"]))
+    metric("network_transmit_bytes_total", "counter", "Bytes sent on all interfaces.", one(net["bytes_sent"]))
+    metric("network_receive_bytes_total", "counter", "Bytes received on all interfaces.", one(net["bytes_recv"]))
+    metric("network_transmit_bytes_per_second", "gauge", "Send rate over the last interval.", one(net["sent_per_sec"]))
+    metric("network_receive_bytes_per_second", "gauge", "Receive rate over the last interval.", one(net["recv_per_sec"]))
+    metric("disk_read_bytes_total", "counter", "Bytes read from all disks.", one(disk["read_bytes"]))
+    metric("disk_written_bytes_total", "counter", "Bytes written to all disks.", one(disk["write_bytes"]))
+    metric("disk_read_bytes_per_second", "gauge", "Disk read rate over the last interval.", one(disk["read_per_sec"]))
+    metric("disk_write_bytes_per_second", "gauge", "Disk write rate over the last interval.", one(disk["write_per_sec"]))
+
+    labels = [(f'{{device="{_label(p["device"])}",mountpoint="{_label(p["mountpoint"])}",'
+               f'fstype="{_label(p["fstype"])}"}}', p) for p in snap["partitions"]]
+    for field, help_text in (("total", "Filesystem size."), ("used", "Used filesystem space."),
+                             ("free", "Free filesystem space.")):
+        metric(f"filesystem_{field}_bytes", "gauge", help_text, [(l, p[field]) for l, p in labels])
+    metric("filesystem_percent", "gauge", "Filesystem utilisation.", [(l, p["percent"]) for l, p in labels])
+    failed = [(f'{{device="{_label(p["device"])}",mountpoint="{_label(p["mountpoint"])}",'
+               f'fstype="{_label(p["fstype"])}"}}', 1) for p in snap["unresponsive"]]
+    metric("filesystem_probe_failed", "gauge", "Mounts that timed out or failed during the last probe.", failed)
+    return "\n".join(lines) + "\n"
+
+class Exporter:
+    """
+    指标导出：后台线程按间隔采样，每次采样后立即把 Prometheus 文本与 JSON 都编码成 bytes 缓存。
+    请求处理只读取缓存 (一次属性读取，天然原子)，不触发任何 psutil 调用
+    """
+    def __init__(self, interval, disk_timeout=DISK_TIMEOUT):
+        self.interval = interval
+        self.disk_timeout = disk_timeout
+        self.sampler = Sampler()
+        self.cache = None
+        self.errors = 0
+        self.stop = threading.Event()
+
+    def refresh(self):
+        snap = snapshot(self.sampler, self.disk_timeout)
+        self.cache = {
+            "/metrics": (PROM_TYPE, render_prometheus(snap).encode()),
+            "/metrics.json": ("application/json", json.dumps(snap, ensure_ascii=False).encode()),
+        }
+
+    def loop(self):
+        while not self.stop.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception:
+                # 采样失败时继续提供上一份缓存
+                self.errors += 1
+
+class ExportHandler(BaseHTTPRequestHandler):
+    """只返回预先编码好的缓存；HTTP/1.1 长连接 + 关闭 Nagle，频繁抓取时延迟在亚毫秒级"""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.respond()
+
+    def do_HEAD(self):
+        self.respond(head=True)
+
+    def respond(self, head=False):
+        cache = self.server.exporter.cache
+        path = self.path.split("?", 1)[0]
+        if path == "/":
+            path = "/metrics"
+        if cache is None:
+            code, ctype, body, extra = 503, "text/plain", b"warming up\n", {"Retry-After": "1"}
+        elif path in cache:
+            code, (ctype, body), extra = 200, cache[path], {}
+        else:
+            code, ctype, body, extra = 404, "text/plain", b"not found\n", {}
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in extra.items():
+            self.send_header(key, value)
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def parse_listen(value):
+    """解析 [HOST:]PORT"""
+    host, _, port = value.rpartition(":")
+    return (host.strip("[]") or "127.0.0.1"), int(port)
+
+def run_exporter(Fore, listen, interval, disk_timeout=DISK_TIMEOUT):
+    try:
+        address = parse_listen(listen)
+        server = ThreadingHTTPServer(address, ExportHandler)
+    except (ValueError, OSError) as e:
+        print(f"{Fore.RED}⚠️ 无法监听 {listen}: {e}")
+        return
+    server.daemon_threads = True
+    server.exporter = exporter = Exporter(interval, disk_timeout)
+    sampler_thread = threading.Thread(target=exporter.loop, daemon=True)
+    sampler_thread.start()
+
+    host, port = server.server_address[:2]
+    print(f"{Fore.CYAN}📡 指标导出已启动: http://{host}:{port}/metrics (JSON: /metrics.json)")
+    print(f"{Fore.WHITE}采样间隔 {interval:g}s，首个样本在一个间隔后就绪 | Ctrl+C 退出")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n{Fore.YELLOW}⚠️ 导出已停止。")
+    finally:
+        exporter.stop.set()
+        server.server_close()
+
 def run_sysinfo(args, tools):
     Fore = tools.get("Fore")
+
+    top = getattr(args, 'top', None)
+    sort = getattr(args, 'sort', "cpu")
+    disk_timeout = getattr(args, 'disk_timeout', DISK_TIMEOUT)
+    if (top is not None and top < 1) or disk_timeout <= 0:
+        print(f"{Fore.RED}⚠️ --top 必须为正整数，--disk-timeout 必须大于 0")
+        return
+
+    listen = getattr(args, 'serve', None)
+    if listen:
+        interval = getattr(args, 'interval', 1.0)
+        if interval <= 0:
+            print(f"{Fore.RED}⚠️ --interval 必须大于 0")
+            return
+        run_exporter(Fore, listen, interval, disk_timeout)
+        return
+
+    if getattr(args, 'watch', False):
+        interval = getattr(args, 'interval', 1.0)
+        history = getattr(args, 'history', 60)
+        if interval <= 0 or history < 2:
+            print(f"{Fore.RED}⚠️ --interval 必须大于 0，--history 至少为 2")
+            return
+        run_watch(Fore, interval, history, top, sort)
+        return
     
     # 1. 采集数据
     uname = platform.uname()
-    # 实时网速：记录初始流量
+    # 实时网速：记录初始流量；同时为 cpu_percent 建立基准，睡眠结束后取到的才是这 1 秒的占用率
+    psutil.cpu_percent(None)
+    table = ProcessTable(sort) if top else None
+    if table:
+        table.sample(top)
+    # 磁盘探测在后台与 1 秒网速采样并行进行
+    probe = DiskProbe(disk_timeout)
     io_start = psutil.net_io_counters()
     time.sleep(1) # 采样间隔 1 秒
     io_end = psutil.net_io_counters()
+    procs = table.sample(top) if table else None
     
     # 计算网速
     up_speed = get_size(io_end.bytes_sent - io_start.bytes_sent)
@@ -48,9 +596,7 @@ def run_sysinfo(args, tools):
     def print_bar(label, percent, info_suffix="", color=Fore.GREEN):
         bar_len = 25
         filled = int(bar_len * percent / 100)
-        # 根据负载自动变换颜色
-        if percent > 85: color = Fore.RED
-        elif percent > 60: color = Fore.YELLOW
+        color = level_color(Fore, percent, color)
         
         bar = "█" * filled + "░" * (bar_len - filled)
         print(f"{label:<8} : {color}[{bar}] {percent}% {Fore.WHITE}{info_suffix}")
@@ -58,7 +604,7 @@ def run_sysinfo(args, tools):
     # 4. CPU & 内存状态
     cpu_freq = psutil.cpu_freq()
     cpu_info = f"({psutil.cpu_count(logical=False)}核/{psutil.cpu_count()}线程 @ {cpu_freq.current:.0f}MHz)" if cpu_freq else ""
-    print_bar("CPU 负载", psutil.cpu_percent(), cpu_info)
+    print_bar("CPU 负载", psutil.cpu_percent(None), cpu_info)
     
     mem = psutil.virtual_memory()
     mem_info = f"({get_size(mem.used)} / {get_size(mem.total)})"
@@ -70,17 +616,18 @@ def run_sysinfo(args, tools):
 
     # 6. 多磁盘分区检测
     print(f"{Fore.CYAN}📁 存储设备详情:")
-    partitions = psutil.disk_partitions()
-    for partition in partitions:
-        # 排除虚拟盘和空盘
-        if os.name == 'nt':
-            if 'cdrom' in partition.opts or partition.fstype == '': continue
-        try:
-            usage = psutil.disk_usage(partition.mountpoint)
-            p_label = f"分区 {partition.device}"
-            p_info = f"{get_size(usage.used)} / {get_size(usage.total)} ({partition.fstype})"
-            print_bar(p_label, usage.percent, p_info, Fore.BLUE)
-        except PermissionError:
-            continue
+    usages, problems = probe.collect()
+    for partition, usage in usages:
+        p_label = f"分区 {partition.device}"
+        p_info = f"{get_size(usage.used)} / {get_size(usage.total)} ({partition.fstype})"
+        print_bar(p_label, usage.percent, p_info, Fore.BLUE)
+    for partition, reason in problems:
+        print(f"{Fore.YELLOW}⏳ 分区 {partition.device} ({partition.mountpoint}) : {reason}")
     
-    print("-" * 65)
\ No newline at end of file
+    print("-" * 65)
+
+    # 7. 进程 Top-N
+    if procs is not None:
+        for line in process_lines(Fore, table, procs):
+            print(line)
+        print("-" * 65)
@@ -1,5 +1,15 @@
 import hashlib
 import base64
+import binascii
+import mmap
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from itertools import groupby
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 __info__ = {
     "help": "字符加密",
@@ -10,10 +20,422 @@ __info__ = {
     "depends": []
 }
 
+ACTIONS = ["md5", "sha256", "base64", "decode", "hash", "verify"]
+
+# 可同时计算的摘要算法，以及 BSD 风格 (--tag) 输出中使用的名称
+HASH_ALGOS = {
+    "md5": "MD5",
+    "sha1": "SHA1",
+    "sha256": "SHA256",
+    "blake2b": "BLAKE2b",
+}
+
+# 校验清单解析：BSD 风格按名称识别算法，GNU 风格按摘要长度识别
+_TAG_ALGOS = {name.upper(): algo for algo, name in HASH_ALGOS.items()}
+_HEX_ALGOS = {32: "md5", 40: "sha1", 64: "sha256", 128: "blake2b"}
+_TAG_LINE = re.compile(r"^(\\?)(\w+) \((.*)\) = ([0-9a-fA-F]+)$")
+_GNU_LINE = re.compile(r"^(\\?)([0-9a-fA-F]+) [ *](.*)$")
+# Debian Release 风格：摘要 大小 路径
+_SIZED_LINE = re.compile(r"^\s*([0-9a-fA-F]+)\s+(\d+)\s+(\S.*)$")
+# 清单中文件名的转义 (与 _unescape 对应)
+_ESCAPES = str.maketrans({"\\": "\\\\", "\n": "\\n", "\r": "\\r"})
+
+# 每次喂给各摘要的块大小；大于 MMAP_THRESHOLD 的文件改用 mmap 切片，避免复制到用户缓冲区
+CHUNK_SIZE = 1 << 20
+MMAP_THRESHOLD = 16 * 1024 * 1024
+
+# Base64 流式处理：编码时每块字节数为 3 * wrap 的整数倍，编码结果恰好是整行；
+# 解码时只把凑满 4 字符的部分交给 a2b_base64，余下的并入下一块
+B64_CHUNK = 1 << 20
+B64_WRAP = 76
+_B64_ALPHABET = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/="
+_WHITESPACE = b" \t\r\n\v\f"
+
+# 摘要计算与读取都会释放 GIL，线程数按 I/O 并发取值
+DEFAULT_WORKERS = min(16, (os.cpu_count() or 1) * 2)
+
+_local = threading.local()
+
 def setup_args(parser):
     """定义命令行参数模式"""
-    parser.add_argument("action", choices=["md5", "sha256", "base64", "decode"], nargs="?", help="操作类型")
+    parser.add_argument("action", choices=ACTIONS, nargs="?", help="操作类型")
+    parser.add_argument("paths", nargs="*",
+                        help="hash: 要计算的文件或目录；verify: 校验清单文件；base64/decode: 输入文件 (- 为标准输入)")
     parser.add_argument("--data", help="要处理的内容")
+    parser.add_argument("--algo", default="sha256", help="hash: 摘要算法，逗号分隔 (md5,sha1,sha256,blake2b)")
+    parser.add_argument("-o", "--output", help="hash/base64/decode: 结果写入文件 (默认标准输出)")
+    parser.add_argument("--wrap", type=int, default=B64_WRAP, help="base64: 每行字符数，0 为不换行")
+    parser.add_argument("--workers", type=int, help="并行计算的线程数")
+    parser.add_argument("--fail-fast", action="store_true", help="verify: 遇到第一个不一致立即停止 (结果按完成顺序输出)")
+    parser.add_argument("--quiet", action="store_true", help="verify: 只输出校验失败的文件")
+
+def _buffer():
+    """每个线程复用一块读缓冲区，读取过程中不再分配内存"""
+    buf = getattr(_local, "buf", None)
+    if buf is None:
+        buf = _local.buf = bytearray(CHUNK_SIZE)
+    return buf
+
+def hash_file(path, algos, stop=None):
+    """
+    流式计算文件的多个摘要：文件只读一遍，同一块数据依次交给每个摘要对象。
+    大文件用 mmap 切片 (零拷贝)，其余用线程内复用的缓冲区 readinto。
+    返回 ({algo: hexdigest}, 文件大小)；stop (threading.Event) 在两块之间被置位时放弃计算，返回 None
+    """
+    digests = [hashlib.new(a) for a in algos]
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                view = memoryview(m)
+                try:
+                    for offset in range(0, len(m), CHUNK_SIZE):
+                        if stop is not None and stop.is_set():
+                            return None
+                        chunk = view[offset:offset + CHUNK_SIZE]
+                        for d in digests:
+                            d.update(chunk)
+                        chunk.release()
+                finally:
+                    view.release()
+        else:
+            buf = _buffer()
+            view = memoryview(buf)
+            while n := f.readinto(buf):
+                if stop is not None and stop.is_set():
+                    return None
+                chunk = view[:n]
+                for d in digests:
+                    d.update(chunk)
+    return {a: d.hexdigest() for a, d in zip(algos, digests)}, size
+
+def iter_files(paths):
+    """展开命令行给出的文件与目录 (目录递归，按名称排序，保证输出顺序稳定)"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    yield os.path.join(root, name)
+        else:
+            yield path
+
+def imap_bounded(pool, fn, items, window, ordered=True):
+    """
+    产出 (item, fn(item) 或异常)：在途任务最多 window 个，
+    文件列表再长也不会一次性堆积全部 future。
+    默认按输入顺序产出；ordered=False 时按完成顺序产出，先算完的结果不必等待排在前面的大文件
+    """
+    pending = deque()
+
+    def result(item, fut):
+        try:
+            return item, fut.result()
+        except Exception as e:
+            return item, e
+
+    def drain():
+        if ordered:
+            yield result(*pending.popleft())
+            return
+        done, _ = wait([fut for _, fut in pending], return_when=FIRST_COMPLETED)
+        for entry in [e for e in pending if e[1] in done]:
+            pending.remove(entry)
+            yield result(*entry)
+
+    try:
+        for item in items:
+            pending.append((item, pool.submit(fn, item)))
+            if len(pending) >= window:
+                yield from drain()
+        while pending:
+            yield from drain()
+    finally:
+        for _, fut in pending:
+            fut.cancel()
+
+def format_sum(path, sums, algos):
+    """
+    单一算法输出 sha256sum 兼容格式，多算法输出 BSD 风格 (sha256sum --tag) 行。
+    文件名含反斜杠或换行时与 coreutils 一样转义，并在行首加反斜杠标记
+    """
+    escaped = path.translate(_ESCAPES)
+    prefix = "\\" if escaped != path else ""
+    if len(algos) == 1:
+        return f"{prefix}{sums[algos[0]]}  {escaped}\n"
+    return "".join(f"{prefix}{HASH_ALGOS[a]} ({escaped}) = {sums[a]}\n" for a in algos)
+
+def _unescape(name):
+    """还原 sha256sum 对含反斜杠、换行的文件名所做的转义"""
+    return re.sub(r"\\(.)", lambda m: {"n": "\n", "r": "\r", "\\": "\\"}.get(m.group(1), m.group(0)), name)
+
+def parse_manifest_line(line):
+    """解析一行校验清单，返回 (name, algo, hexdigest, size 或 None)；无法识别时返回 None"""
+    line = line.rstrip("\r\n")
+    m = _TAG_LINE.match(line)
+    if m:
+        escaped, tag, name, digest = m.groups()
+        algo = _TAG_ALGOS.get(tag.upper())
+        size = None
+    else:
+        m = _GNU_LINE.match(line)
+        if m:
+            escaped, digest, name = m.groups()
+            size = None
+        else:
+            m = _SIZED_LINE.match(line)
+            if not m:
+                return None
+            digest, size, name = m.groups()
+            escaped, size = "", int(size)
+        algo = _HEX_ALGOS.get(len(digest))
+    if algo is None or not name:
+        return None
+    return (_unescape(name) if escaped else name), algo, digest.lower(), size
+
+def parse_manifest(path, stats):
+    """
+    逐行读取校验清单，产出 (文件路径, {algo: hexdigest}, size 或 None)。
+    同一文件连续的多行 (多算法 --tag 输出) 合并为一项，只读一遍文件。
+    相对路径以清单所在目录为基准；无法识别的行计入 stats["bad"]
+    """
+    base = os.path.dirname(path)
+
+    def lines():
+        with open(path, "r", encoding="utf-8", errors="surrogateescape") as f:
+            for line in f:
+                if not line.strip() or line.startswith("#"):
+                    continue
+                entry = parse_manifest_line(line)
+                if entry is None:
+                    stats["bad"] += 1
+                    continue
+                yield entry
+
+    for name, group in groupby(lines(), key=lambda e: e[0]):
+        sums, size = {}, None
+        for _, algo, digest, sz in group:
+            sums[algo] = digest
+            size = sz if sz is not None else size
+        yield os.path.join(base, name), sums, size
+
+def verify_entry(item, stop=None):
+    """校验一项：先比较大小 (清单中记录了大小时)，不一致则不再读取内容；被 stop 取消时返回 None"""
+    path, expected, size = item
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return "MISSING", 0
+    if size is not None and st.st_size != size:
+        return "SIZE", 0
+    res = hash_file(path, list(expected), stop)
+    if res is None:
+        return None
+    sums, read = res
+    return ("OK" if sums == expected else "FAILED"), read
+
+def run_verify(args, Fore, manifests):
+    """按清单并行校验文件；存在不一致、缺失或无法识别的行时以非零状态码退出"""
+    workers = getattr(args, 'workers', None) or DEFAULT_WORKERS
+    fail_fast = getattr(args, 'fail_fast', False)
+    quiet = getattr(args, 'quiet', False)
+    stats = {"bad": 0}
+    counts = {"OK": 0, "FAILED": 0, "SIZE": 0, "MISSING": 0, "ERROR": 0}
+    labels = {"FAILED": "FAILED", "SIZE": "FAILED (大小不符)", "MISSING": "FAILED (文件不存在)"}
+    total = 0
+    start = time.time()
+
+    def items():
+        for manifest in manifests:
+            try:
+                yield from parse_manifest(manifest, stats)
+            except OSError as e:
+                print(f"{Fore.RED}{manifest}: {e}", file=sys.stderr)
+                stats["bad"] += 1
+
+    # --fail-fast 按完成顺序消费结果，最先算完的不一致即可结束；
+    # 结束时置位 stop，在途的大文件在下一块之前放弃，不必等它们读完
+    stop = threading.Event()
+    pool = ThreadPoolExecutor(workers)
+    results = imap_bounded(pool, lambda item: verify_entry(item, stop), items(), workers * 4, ordered=not fail_fast)
+    try:
+        for (path, _, _), res in results:
+            if isinstance(res, Exception):
+                status, read = "ERROR", 0
+                label = f"FAILED ({res})"
+            else:
+                status, read = res
+                label = labels.get(status, status)
+            counts[status] += 1
+            total += read
+            if status == "OK":
+                if not quiet:
+                    print(f"{Fore.GREEN}{path}: OK")
+                continue
+            print(f"{Fore.RED}{path}: {label}")
+            if fail_fast:
+                break
+    except KeyboardInterrupt:
+        print(f"\n{Fore.YELLOW}⚠️ 用户中断。", file=sys.stderr)
+        counts["ERROR"] += 1
+    finally:
+        stop.set()
+        results.close()
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    elapsed = max(time.time() - start, 1e-9)
+    failed = counts["FAILED"] + counts["SIZE"] + counts["MISSING"] + counts["ERROR"]
+    print("-" * 62)
+    print(f"{Fore.CYAN}✨ 通过 {counts['OK']} | 失败 {failed} (内容 {counts['FAILED']} / 大小 {counts['SIZE']}"
+          f" / 缺失 {counts['MISSING']} / 错误 {counts['ERROR']})")
+    if stats["bad"]:
+        print(f"{Fore.YELLOW}⚠️ {stats['bad']} 行格式无法识别")
+    print(f"{Fore.CYAN}📐 读取 {total/1024/1024:.1f} MB | {elapsed:.2f}s | {total/1024/1024/elapsed:.1f} MB/s")
+    if failed or stats["bad"]:
+        sys.exit(1)
+
+def _read_full(src, buf):
+    """填满缓冲区 (管道可能短读)，只有到达末尾时才返回不足一块的长度"""
+    view = memoryview(buf)
+    total = 0
+    while total < len(buf):
+        n = src.readinto(view[total:])
+        if not n:
+            break
+        total += n
+    return total
+
+def _wrap_lines(enc, width):
+    """
+    每 width 个字符插入换行。行数多于行宽时按列做步长切片赋值，
+    循环次数只与行宽有关，避免每行一次 Python 操作
+    """
+    lines, rem = divmod(len(enc), width)
+    if lines > width:
+        out = bytearray(lines * (width + 1))
+        for col in range(width):
+            out[col::width + 1] = enc[col:lines * width:width]
+        out[width::width + 1] = b"\n" * lines
+    else:
+        out = bytearray(b"\n".join(enc[i:i + width] for i in range(0, lines * width, width)))
+        if lines:
+            out += b"\n"
+    if rem:
+        out += enc[lines * width:] + b"\n"
+    return out
+
+def b64_encode_stream(src, dst, wrap=B64_WRAP):
+    """
+    流式 Base64 编码：输入按 3 字节 (换行时按 3 * wrap 字节) 对齐分块，内存占用恒定。
+    换行时块缩小到 1/4，步长拷贝的源与目标都留在缓存内
+    """
+    unit = 3 * wrap if wrap > 0 else 3
+    chunk = B64_CHUNK // 4 if wrap > 0 else B64_CHUNK
+    buf = bytearray(max(1, chunk // unit) * unit)
+    view = memoryview(buf)
+    while n := _read_full(src, buf):
+        enc = binascii.b2a_base64(view[:n], newline=False)
+        dst.write(_wrap_lines(enc, wrap) if wrap > 0 else enc)
+        if n < len(buf):
+            break
+
+def _a2b_strict(data):
+    """
+    严格解码：非严格模式会静默丢弃非法字符，破坏 4 字符对齐。
+    3.11+ 由 strict_mode 在解码时一并检查，旧版本先用 translate 做一遍字符集校验
+    """
+    if sys.version_info >= (3, 11):
+        return binascii.a2b_base64(data, strict_mode=True)
+    if data.translate(None, _B64_ALPHABET):
+        raise ValueError("包含非 Base64 字符")
+    return binascii.a2b_base64(data)
+
+def b64_decode_stream(src, dst):
+    """流式 Base64 解码：去掉空白 (兼容按行折叠的输入) 后按 4 字符对齐分块"""
+    buf = bytearray(B64_CHUNK)
+    carry = b""
+    while n := src.readinto(buf):
+        data = carry + buf[:n].translate(None, _WHITESPACE)
+        cut = len(data) - len(data) % 4
+        dst.write(_a2b_strict(data[:cut]))
+        carry = bytes(data[cut:])
+    if carry:
+        dst.write(_a2b_strict(carry))
+
+def run_base64_stream(args, Fore, action, source):
+    """文件 / 标准输入到文件 / 标准输出的流式编解码，结果写到标准输出时提示改走 stderr"""
+    output = getattr(args, 'output', None)
+    log = sys.stdout if output else sys.stderr
+    src = dst = None
+    start = time.time()
+    try:
+        src = sys.stdin.buffer if source == "-" else open(source, "rb")
+        dst = open(output, "wb") if output else sys.stdout.buffer
+        if action == "base64":
+            b64_encode_stream(src, dst, getattr(args, 'wrap', B64_WRAP))
+        else:
+            b64_decode_stream(src, dst)
+    except (ValueError, binascii.Error) as e:
+        print(f"{Fore.RED}错误：输入的不是有效的 Base64 字符串 ({e})。", file=log)
+        return
+    except OSError as e:
+        print(f"{Fore.RED}执行失败: {e}", file=log)
+        return
+    except KeyboardInterrupt:
+        print(f"\n{Fore.YELLOW}⚠️ 用户中断。", file=sys.stderr)
+        return
+    finally:
+        if src is not None and src is not sys.stdin.buffer:
+            src.close()
+        if dst is not None:
+            dst.close() if output else dst.flush()
+
+    if output:
+        size = os.path.getsize(output)
+        print(f"{Fore.CYAN}✨ {size/1024/1024:.1f} MB | {time.time() - start:.2f}s", file=log)
+        print(f"{Fore.CYAN}📁 结果已保存至 {output}", file=log)
+
+def run_hash(args, Fore, paths, log):
+    algos = [a.strip().lower() for a in (getattr(args, 'algo', None) or "sha256").split(",") if a.strip()]
+    unknown = [a for a in algos if a not in HASH_ALGOS]
+    if unknown or not algos:
+        print(f"{Fore.RED}⚠️ 不支持的算法: {', '.join(unknown)} (可选 {', '.join(HASH_ALGOS)})", file=log)
+        return
+
+    output = getattr(args, 'output', None)
+    try:
+        out = open(output, "w", encoding="utf-8", newline="\n") if output else sys.stdout
+    except OSError as e:
+        print(f"{Fore.RED}执行失败: {e}", file=log)
+        return
+
+    workers = getattr(args, 'workers', None) or DEFAULT_WORKERS
+    count = failed = total = 0
+    start = time.time()
+    try:
+        with ThreadPoolExecutor(workers) as pool:
+            for path, res in imap_bounded(pool, lambda p: hash_file(p, algos), iter_files(paths), workers * 4):
+                if isinstance(res, Exception):
+                    failed += 1
+                    print(f"{Fore.RED}{path}: {res}", file=sys.stderr)
+                    continue
+                sums, size = res
+                count += 1
+                total += size
+                out.write(format_sum(path, sums, algos))
+    except KeyboardInterrupt:
+        print(f"\n{Fore.YELLOW}⚠️ 用户中断。", file=sys.stderr)
+    finally:
+        if output:
+            out.close()
+        else:
+            out.flush()
+
+    elapsed = max(time.time() - start, 1e-9)
+    print(f"{Fore.CYAN}✨ {count} 个文件 | {total/1024/1024:.1f} MB | {total/1024/1024/elapsed:.1f} MB/s"
+          f"{f' | {failed} 个失败' if failed else ''}", file=log)
+    if output:
+        print(f"{Fore.CYAN}📁 结果已保存至 {output}", file=log)
 
 def run_vault(args, tools):
     Fore = tools["Fore"]
@@ -23,17 +445,53 @@ def run_vault(args, tools):
     except ImportError:
         questionary = None
 
-    print(f"{Fore.CYAN}🔐 DevBox Vault - 安全辅助工具")
-    print("-" * 62)
-
     # 1. 获取操作类型 (Action)
     action = getattr(args, 'action', None)
     if not action and questionary:
         action = questionary.select(
             "请选择操作类型:",
-            choices=["md5", "sha256", "base64", "decode"]
+            choices=ACTIONS
         ).ask()
 
+    # 文件模式：摘要结果写到标准输出时，提示信息改走 stderr
+    if action == "hash":
+        paths = getattr(args, 'paths', None)
+        if not paths and questionary:
+            path = questionary.text("请输入文件或目录路径:").ask()
+            paths = [path] if path else []
+        log = sys.stderr if not getattr(args, 'output', None) else sys.stdout
+        print(f"{Fore.CYAN}🔐 DevBox Vault - 安全辅助工具", file=log)
+        print("-" * 62, file=log)
+        if not paths:
+            print(f"{Fore.RED}⚠️ 操作取消：未提供必要的信息。", file=log)
+            return
+        run_hash(args, Fore, paths, log)
+        print("-" * 62, file=log)
+        return
+
+    # Base64 流式模式：给出输入文件，或未提供 --data 且标准输入来自管道
+    if action in ("base64", "decode") and not getattr(args, 'data', None):
+        paths = getattr(args, 'paths', None)
+        if paths or not sys.stdin.isatty():
+            run_base64_stream(args, Fore, action, paths[0] if paths else "-")
+            return
+
+    if action == "verify":
+        manifests = getattr(args, 'paths', None)
+        if not manifests and questionary:
+            manifest = questionary.text("请输入校验清单路径 (如 SHA256SUMS):").ask()
+            manifests = [manifest] if manifest else []
+        print(f"{Fore.CYAN}🔐 DevBox Vault - 安全辅助工具")
+        print("-" * 62)
+        if not manifests:
+            print(f"{Fore.RED}⚠️ 操作取消：未提供必要的信息。")
+            return
+        run_verify(args, Fore, manifests)
+        return
+
+    print(f"{Fore.CYAN}🔐 DevBox Vault - 安全辅助工具")
+    print("-" * 62)
+
     # 2. 获取数据 (Data)
     data = getattr(args, 'data', None)
     if not data and questionary: